@@ -0,0 +1,153 @@
+# COMP30024 Artificial Intelligence, Semester 1 2023
+# Project Part B: Game Playing Agent
+
+# Batched evaluation of successors with NumPy. Rather than applying, scoring
+# and undoing each candidate move in turn, all k children of a position are
+# laid out as a pair of (k, 49) arrays:
+#   - owner: +1 for a red piece, -1 for a blue piece, 0 for an empty cell
+#   - power: the power of the piece on each cell, 0 for an empty cell
+# and the coverage of both colours in every child is worked out at once with
+# a precomputed footprint matrix (float, so the product runs through BLAS; the
+# values are small integers and stay exact). This gives the same scores as calling
+# evaluateAtkDef and evaluatePower on each child.
+
+import numpy as np
+
+from .board import Board, DIM, CELLS, MAX_POWER, DIRECTIONS, DIRECTION_INDEX, \
+    SPREAD_MASKS, cellIndex, cellPosition, iterBits
+from .coverage import POWER_DISTANCE_COVERAGE
+
+COLOUR_CODE = {'r': 1, 'b': -1}
+
+
+def generateFootprintMatrix():
+    """
+    Generates a (49 * 3, 49) matrix whose row index * 3 + (distance - 1) marks
+    the cells that distance away from the cell along each direction. A piece
+    covers those cells POWER_DISTANCE_COVERAGE[power][distance - 1] times.
+    """
+    matrix = np.zeros((CELLS * 3, CELLS))
+
+    for index in range(CELLS):
+        (r, q) = cellPosition(index)
+        for (dr, dq) in DIRECTIONS:
+            for distance in range(1, 4):
+                coveredIndex = cellIndex(((r + dr * distance) % DIM, (q + dq * distance) % DIM))
+                matrix[index * 3 + distance - 1, coveredIndex] = 1
+
+    return matrix
+
+
+def generateDistanceWeights():
+    """ Generates a (7, 3) array of POWER_DISTANCE_COVERAGE, with a zero row for power 0 """
+    weights = np.zeros((MAX_POWER + 1, 3))
+    for power in range(1, MAX_POWER + 1):
+        weights[power] = POWER_DISTANCE_COVERAGE[power]
+    return weights
+
+
+def generateLandedRows():
+    """
+    Generates a (49, 6, 7, 49) boolean table of the cells a stack lands on,
+    indexed by [cell][direction][power] like SPREAD_MASKS.
+    """
+    rows = np.zeros((CELLS, len(DIRECTION_INDEX), MAX_POWER + 1, CELLS), dtype=bool)
+
+    for index in range(CELLS):
+        for direction in range(len(DIRECTION_INDEX)):
+            for power in range(1, MAX_POWER + 1):
+                for landedIndex in iterBits(SPREAD_MASKS[index][direction][power]):
+                    rows[index, direction, power, landedIndex] = True
+
+    return rows
+
+
+FOOTPRINT_MATRIX = generateFootprintMatrix()
+DISTANCE_WEIGHTS = generateDistanceWeights()
+LANDED_ROWS = generateLandedRows()
+
+
+def boardArrays(board: Board):
+    """ Returns the (49,) owner and power arrays of a board """
+    owner = np.zeros(CELLS, dtype=np.int8)
+    power = np.zeros(CELLS, dtype=np.int8)
+
+    for (index, colour, p) in board.pieces():
+        owner[index] = COLOUR_CODE[colour]
+        power[index] = p
+
+    return (owner, power)
+
+
+def childArrays(owner, power, moves: list):
+    """
+    Returns the (k, 49) owner and power arrays of the children reached by
+    each of k moves from the position given by (49,) owner and power arrays.
+    """
+    k = len(moves)
+    landed = np.zeros((k, CELLS), dtype=bool)
+    sources = np.full(k, -1)
+    mover = np.zeros(k, dtype=np.int8)
+
+    # a spawn behaves like a spread landing on a single empty cell
+    for (row, move) in enumerate(moves):
+        index = cellIndex(move[1])
+        if move[0] == 'spread':
+            landed[row] = LANDED_ROWS[index, DIRECTION_INDEX[move[2]], power[index]]
+            sources[row] = index
+            mover[row] = owner[index]
+        else:
+            landed[row, index] = True
+            mover[row] = COLOUR_CODE[move[2]]
+
+    # landed stacks go up one power and change colour, max power stacks vanish
+    survives = power < MAX_POWER
+    childPower = np.where(landed, (power + 1) * survives, power)
+    childOwner = np.where(landed, mover[:, None] * survives, owner)
+
+    # spread sources are emptied
+    spreads = np.nonzero(sources >= 0)[0]
+    childPower[spreads, sources[spreads]] = 0
+    childOwner[spreads, sources[spreads]] = 0
+
+    return (childOwner.astype(np.int8), childPower.astype(np.int8))
+
+
+def coverageBatch(owners, powers, code: int):
+    """ Returns the (k, 49) coverage of every cell by the colour with this code """
+    k = owners.shape[0]
+    weights = DISTANCE_WEIGHTS[powers] * (owners == code)[:, :, None]
+    return (weights.reshape(k, CELLS * 3) @ FOOTPRINT_MATRIX).astype(np.int32)
+
+
+def evaluateBatch(owners, powers, colourToMove):
+    """
+    Evaluates k positions at once. Returns vectors of the primary and
+    secondary evaluateAtkDef scores, and of evaluatePower.
+    """
+    toMoveCode = COLOUR_CODE[colourToMove]
+    toMoveCoverage = coverageBatch(owners, powers, toMoveCode)
+    justPlayedCoverage = coverageBatch(owners, powers, -toMoveCode)
+
+    powers = powers.astype(np.int32)
+    toMove = owners == toMoveCode
+    justPlayed = owners == -toMoveCode
+    defended = toMoveCoverage >= justPlayedCoverage
+    attacked = justPlayedCoverage >= toMoveCoverage
+
+    # pieces of the colour to move count for it if they are defended, and
+    # pieces of the colour that just played count against it if attacked
+    score = np.where(toMove, np.where(defended, powers, -powers), 0).sum(axis=1)
+    score += np.where(justPlayed, np.where(attacked, -powers, powers), 0).sum(axis=1)
+
+    # the colour that just played gets back its best capture
+    bestCapture = np.where(toMove & ~defended, powers, 0).max(axis=1)
+
+    primary = score + bestCapture
+    secondary = np.where(owners != 0, toMoveCoverage - justPlayedCoverage, 0).sum(axis=1)
+    powerBalance = (owners * powers).sum(axis=1)
+
+    if colourToMove == 'r':
+        return (primary, secondary, powerBalance)
+    else:
+        return (-primary, -secondary, powerBalance)
@@ -0,0 +1,314 @@
+# COMP30024 Artificial Intelligence, Semester 1 2023
+# Project Part B: Game Playing Agent
+
+# A compact bitboard representation of the 7x7 Infexion torus. Cell (r, q) is
+# stored as bit r * DIM + q of a Python int, so the whole board fits in a
+# handful of 49-bit masks:
+#   - one occupancy mask per colour ('r' and 'b')
+#   - one plane per power (1 to MAX_POWER) marking the cells stacked to it
+# Spawns and spreads are applied as a few mask operations rather than dict
+# updates, which makes generating and evaluating positions in the search a lot
+# cheaper. Each board also carries an incremental Zobrist key of its contents.
+
+import random
+
+from referee.game import constants, SPREAD_TABLE, DIRECTION_INDEX as TABLE_DIRECTION_INDEX
+
+# the game's constants, under the names the agent uses, so that every module
+# takes them from here rather than keeping copies
+DIM = constants.BOARD_N
+CELLS = DIM * DIM
+MAX_POWER = constants.MAX_CELL_POWER
+MAX_BOARD_POW = constants.MAX_TOTAL_POWER
+MAX_TURNS = constants.MAX_TURNS
+WIN_POWER_DIFF = constants.WIN_POWER_DIFF
+FULL_MASK = (1 << CELLS) - 1
+
+DIRECTIONS = ((1,-1), (1,0), (0,1), (-1,1), (-1,0), (0,-1))
+ENEMY = {'r': 'b', 'b': 'r'}
+DIRECTION_INDEX = {direction: k for (k, direction) in enumerate(DIRECTIONS)}
+
+
+def cellIndex(position: tuple):
+    """ Returns the bit index of a (r, q) position """
+    return position[0] * DIM + position[1]
+
+
+def cellPosition(index: int):
+    """ Returns the (r, q) position of a bit index """
+    return divmod(index, DIM)
+
+
+def iterBits(mask: int):
+    """ Yields the index of every set bit in a mask, lowest first """
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def generateSpreadMasks():
+    """
+    Generates a table indexed by [cell][direction][power] holding the mask of
+    cells a stack of that power lands on when spread in that direction, from
+    the destinations in the shared spread table.
+    """
+    spreadMasks = []
+
+    for index in range(CELLS):
+        byDirection = []
+
+        for direction in DIRECTIONS:
+            destinations = SPREAD_TABLE[index][TABLE_DIRECTION_INDEX[direction]]
+            byDirection.append(tuple(
+                sum(1 << landedIndex for landedIndex in cells) for cells in destinations
+            ))
+
+        spreadMasks.append(tuple(byDirection))
+
+    return tuple(spreadMasks)
+
+
+SPREAD_MASKS = generateSpreadMasks()
+
+
+def generateZobristKeys():
+    """
+    Generates a random 64-bit key for every (colour, power, cell) triple, plus
+    a key for blue to move. The generator is seeded so that keys are the same
+    in every process and every run.
+    """
+    rng = random.Random(30024)
+
+    pieceKeys = {}
+    for colour in ('r', 'b'):
+        pieceKeys[colour] = ((),) + tuple(
+            tuple(rng.getrandbits(64) for _ in range(CELLS))
+            for _ in range(MAX_POWER)
+        )
+
+    sideKeys = {'r': 0, 'b': rng.getrandbits(64)}
+
+    return (pieceKeys, sideKeys)
+
+
+# ZOBRIST[colour][power][index], SIDE_TO_MOVE[colour]
+(ZOBRIST, SIDE_TO_MOVE) = generateZobristKeys()
+
+
+################################################################################
+############################### Board Class ####################################
+################################################################################
+
+class Board:
+    """
+    A data structure to represent the internal state of the board as bitmasks.
+    """
+    __slots__ = ("red", "blue", "planes", "key", "coverage")
+
+    def __init__(self):
+        # occupancy masks for each colour
+        self.red = 0
+        self.blue = 0
+
+        # planes[p] marks the cells with power p, planes[0] is unused
+        self.planes = [0] * (MAX_POWER + 1)
+
+        # Zobrist key of the pieces on the board
+        self.key = 0
+
+        # optional coverage.CoverageState kept up to date with every change
+        self.coverage = None
+
+    def colourMask(self, colour: str):
+        """ Returns the occupancy mask of a colour """
+        if colour == 'r':
+            return self.red
+        return self.blue
+
+    def occupied(self):
+        """ Returns the mask of all occupied cells """
+        return self.red | self.blue
+
+    def colourAt(self, index: int):
+        """ Returns the colour of the piece on a cell, or None if it is empty """
+        bit = 1 << index
+        if self.red & bit:
+            return 'r'
+        if self.blue & bit:
+            return 'b'
+        return None
+
+    def powerAt(self, index: int):
+        """ Returns the power of the piece on a cell, or 0 if it is empty """
+        planes = self.planes
+        for power in range(1, MAX_POWER + 1):
+            if planes[power] >> index & 1:
+                return power
+        return 0
+
+    def get(self, position: tuple):
+        """ Returns the (colour, power) of a position, or None if it is empty """
+        index = cellIndex(position)
+        colour = self.colourAt(index)
+        if colour is None:
+            return None
+        return (colour, self.powerAt(index))
+
+    def spawn(self, position: tuple, color):
+        """ Spawns a piece (its position) on the board """
+        index = cellIndex(position)
+        bit = 1 << index
+        if color == 'r':
+            self.red |= bit
+        else:
+            self.blue |= bit
+        self.planes[1] |= bit
+        self.key ^= ZOBRIST[color][1][index]
+
+        if self.coverage is not None:
+            self.coverage.update(((index, None, 0, color, 1),))
+
+    def countPieces(self, color: str):
+        """ Counts the number of pieces on the board for a given color """
+        return self.colourMask(color).bit_count()
+
+    def spread(self, piece: tuple, direction: tuple):
+        """ Spreads a piece (its position) in a direction on the board """
+        index = cellIndex(piece)
+        source = 1 << index
+        planes = self.planes
+        power = self.powerAt(index)
+        landed = SPREAD_MASKS[index][DIRECTION_INDEX[direction]][power]
+        red = self.red
+        occupied = red | self.blue
+        colour = 'r' if red & source else 'b'
+
+        # update the key with the old and new state of every touched cell,
+        # and list the changes as (index, old colour, old power, new colour,
+        # new power) for the coverage state
+        keys = ZOBRIST[colour]
+        key = self.key ^ keys[power][index]
+        changes = [(index, colour, power, None, 0)]
+        for landedIndex in iterBits(landed):
+            bit = 1 << landedIndex
+            if occupied & bit:
+                landedPower = 1
+                while not planes[landedPower] & bit:
+                    landedPower += 1
+                landedColour = 'r' if red & bit else 'b'
+                key ^= ZOBRIST[landedColour][landedPower][landedIndex]
+                if landedPower < MAX_POWER:
+                    key ^= keys[landedPower + 1][landedIndex]
+                    changes.append((landedIndex, landedColour, landedPower, colour, landedPower + 1))
+                else:
+                    changes.append((landedIndex, landedColour, landedPower, None, 0))
+            else:
+                key ^= keys[1][landedIndex]
+                changes.append((landedIndex, None, 0, colour, 1))
+        self.key = key
+
+        # stacks already at max power are removed when spread onto
+        removed = planes[MAX_POWER] & landed
+
+        # every other landed cell moves up one power plane
+        for p in range(MAX_POWER, 1, -1):
+            planes[p] = (planes[p] & ~landed) | (planes[p - 1] & landed)
+        planes[1] = (planes[1] & ~landed) | (landed & ~occupied)
+        planes[power] &= ~source
+
+        # landed cells take the colour of the spreading piece
+        vacated = ~(landed | source)
+        captured = landed & ~removed
+        if colour == 'r':
+            self.red = (self.red & vacated) | captured
+            self.blue &= ~landed
+        else:
+            self.blue = (self.blue & vacated) | captured
+            self.red &= ~landed
+
+        if self.coverage is not None:
+            self.coverage.update(changes)
+
+    def snapshot(self):
+        """ Returns a token that undo() uses to restore the board as it is now """
+        # the masks are immutable ints, so remembering the old ones is enough
+        # to restore every cell a move touches
+        coverage = None
+        if self.coverage is not None:
+            coverage = self.coverage.snapshot()
+        return (self.red, self.blue, tuple(self.planes), self.key, coverage)
+
+    def apply(self, move: tuple):
+        """
+        Applies a ('spread', position, direction) or ('spawn', position, colour)
+        move in place, returning a token that undo() uses to take it back
+        """
+        token = self.snapshot()
+
+        if move[0] == 'spread':
+            self.spread(move[1], move[2])
+        else:
+            self.spawn(move[1], move[2])
+
+        return token
+
+    def undo(self, token):
+        """ Takes back the move that returned the token from apply() """
+        (self.red, self.blue, planes, self.key, coverage) = token
+        self.planes[:] = planes
+        if coverage is not None:
+            self.coverage.restore(coverage)
+
+    def totalPower(self):
+        """ Returns the sum of powers on the board """
+        planes = self.planes
+        return sum(p * planes[p].bit_count() for p in range(1, MAX_POWER + 1))
+
+    def powerBalance(self):
+        """ Returns red's total power minus blue's total power """
+        planes = self.planes
+        red = self.red
+        blue = self.blue
+        balance = 0
+        for p in range(1, MAX_POWER + 1):
+            balance += p * ((planes[p] & red).bit_count() - (planes[p] & blue).bit_count())
+        return balance
+
+    def pieces(self):
+        """ Returns a list of (index, colour, power) for every piece on the board """
+        planes = self.planes
+        red = self.red
+        blue = self.blue
+        pieces = []
+        for p in range(1, MAX_POWER + 1):
+            plane = planes[p]
+            if not plane:
+                continue
+            # iterBits inlined, this is called at every node of the search
+            mask = plane & red
+            while mask:
+                low = mask & -mask
+                pieces.append((low.bit_length() - 1, 'r', p))
+                mask ^= low
+            mask = plane & blue
+            while mask:
+                low = mask & -mask
+                pieces.append((low.bit_length() - 1, 'b', p))
+                mask ^= low
+        return pieces
+
+    def items(self):
+        """ Yields ((r, q), (colour, power)) pairs, like the old dict board """
+        for (index, colour, power) in self.pieces():
+            yield (cellPosition(index), (colour, power))
+
+    def toDict(self):
+        """ Returns the board as a dict[tuple, tuple], e.g. for render_board """
+        return dict(self.items())
+
+    def getValues(self):
+        return [value for (_, value) in self.items()]
+
+    def getKeys(self):
+        return [position for (position, _) in self.items()]
@@ -0,0 +1,273 @@
+# COMP30024 Artificial Intelligence, Semester 1 2023
+# Project Part B: Game Playing Agent
+
+# An opening book. With the torus symmetries (see symmetry.py) there are only
+# a handful of different positions in the first few turns, so they are all
+# searched deeply ahead of time and the agent plays their best moves straight
+# from a file instead of spending its time budget on them.
+#
+# The book file is a sorted array of fixed-size records, each holding the
+# canonical key of a position (with the side to move), the best move in the
+# canonical frame and its score. The agent maps the file with mmap the first
+# time it looks something up, and finds positions by binary search, so
+# importing the agent costs nothing extra and a lookup takes microseconds.
+#
+# Building and learning are run offline:
+#   python -m agent.book build [--plies N] [--depth D]
+#       searches every position in the first N turns to depth D
+#   python -m agent.book learn LOGFILE...
+#       replays finished games from referee game logs (-l LOGFILE). Where a
+#       book move was played by the side that lost, its position is searched
+#       again, deeper, and any position the winner reached that isn't in the
+#       book yet is added.
+
+import math
+import mmap
+import os
+import re
+import struct
+
+from .board import Board, ENEMY, SIDE_TO_MOVE
+from .symmetry import canonicalKey, toCanonical, fromCanonical
+from .transposition import SCORE_LIMIT, encodeMove, decodeMove
+from .moves import allMoves
+
+BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin")
+
+# key, move (as packed by transposition.encodeMove) and score
+RECORD = struct.Struct("<QHh")
+
+# positions after fewer than BOOK_PLIES actions are in the book, searched to
+# BOOK_DEPTH, and losing book moves are searched again to LEARN_DEPTH
+BOOK_PLIES = 5
+BOOK_DEPTH = 6
+LEARN_DEPTH = BOOK_DEPTH + 1
+
+
+def bookKey(board: Board, colour):
+    """ Returns the book key of a position with colour to move, and the transform to its canonical frame """
+    (key, transform) = canonicalKey(board)
+    return (key ^ SIDE_TO_MOVE[colour], transform)
+
+
+class OpeningBook:
+    """ A book file, opened with mmap on the first lookup """
+
+    def __init__(self, path: str = BOOK_PATH):
+        self.path = path
+        self.data = None
+        self.records = 0
+        self.opened = False
+
+    def open(self):
+        """ Maps the book file, if there is one """
+        self.opened = True
+        try:
+            with open(self.path, "rb") as file:
+                if os.fstat(file.fileno()).st_size >= RECORD.size:
+                    self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                    self.records = len(self.data) // RECORD.size
+        except OSError:
+            self.data = None
+
+    def probe(self, key: int):
+        """ Returns the (move, score) stored for a key, move in the canonical frame, or None """
+        if not self.opened:
+            self.open()
+        if self.data is None:
+            return None
+
+        low = 0
+        high = self.records
+        while low < high:
+            middle = (low + high) // 2
+            (middleKey, move, score) = RECORD.unpack_from(self.data, middle * RECORD.size)
+            if middleKey < key:
+                low = middle + 1
+            elif middleKey > key:
+                high = middle
+            else:
+                return (decodeMove(move), score)
+        return None
+
+    def lookup(self, board: Board, colour):
+        """ Returns the book move for a position in the real frame, or None """
+        (key, transform) = bookKey(board, colour)
+        entry = self.probe(key)
+        if entry is None:
+            return None
+        return fromCanonical(entry[0], transform)
+
+    def entries(self):
+        """ Returns every record as a dict of key: (move, score) """
+        if not self.opened:
+            self.open()
+        entries = {}
+        for record in range(self.records):
+            (key, move, score) = RECORD.unpack_from(self.data, record * RECORD.size)
+            entries[key] = (decodeMove(move), score)
+        return entries
+
+    def close(self):
+        if self.data is not None:
+            self.data.close()
+        self.data = None
+        self.opened = False
+
+
+def writeBook(entries: dict, path: str = BOOK_PATH):
+    """ Writes a dict of key: (canonical move, score) as a book file, sorted by key """
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as file:
+        for key in sorted(entries):
+            (move, score) = entries[key]
+            score = int(max(-SCORE_LIMIT, min(SCORE_LIMIT, score)))
+            file.write(RECORD.pack(key, encodeMove(move), score))
+    os.replace(temporary, path)
+
+################################################################################
+############################ Offline building ##################################
+################################################################################
+
+def newBoard():
+    """ Returns an empty board with the states the search expects """
+    from .coverage import CoverageState
+
+    board = Board()
+    board.coverage = CoverageState(board)
+    return board
+
+
+def searchPosition(board: Board, colour, depth: int):
+    """ Searches a position to depth, returning its best move in the real frame and its score """
+    from .program import minimax
+
+    searcher = minimax()
+    searcher.table.newSearch()
+    for iteration in range(1, depth + 1):
+        move = searcher.next_move(board, colour, iteration)
+
+    key = searcher.positionKey(board, colour)
+    score = searcher.table.probe(key)[3]
+    if math.isinf(score):
+        score = math.copysign(SCORE_LIMIT, score)
+    return (move, score)
+
+
+def build(plies: int = BOOK_PLIES, depth: int = BOOK_DEPTH, path: str = BOOK_PATH):
+    """ Searches every position in the first plies turns, one per symmetry class, into a book """
+    board = newBoard()
+    entries = {}
+    frontier = [[]]
+
+    for ply in range(plies):
+        colour = 'r' if ply % 2 == 0 else 'b'
+        following = []
+
+        for line in frontier:
+            tokens = [board.apply(move) for move in line]
+
+            (key, transform) = bookKey(board, colour)
+            if key not in entries:
+                (move, score) = searchPosition(board, colour, depth)
+                entries[key] = (toCanonical(move, transform), score)
+
+                # one line per new position reached from this one
+                reached = set()
+                for move in allMoves(board, colour):
+                    token = board.apply(move)
+                    (childKey, _) = bookKey(board, ENEMY[colour])
+                    board.undo(token)
+                    if childKey not in reached:
+                        reached.add(childKey)
+                        following.append(line + [move])
+
+            for token in reversed(tokens):
+                board.undo(token)
+
+        print(f"ply {ply}: {len(entries)} positions in the book")
+        frontier = following
+
+    writeBook(entries, path)
+
+################################################################################
+############################# Learning mode ####################################
+################################################################################
+
+ACTION_PATTERN = re.compile(r"(SPAWN|SPREAD)\(([-\d, ]+)\)")
+
+
+def readGame(logPath: str):
+    """
+    Reads the moves and winner ('r', 'b' or None for a draw) of a game from a
+    referee game log
+    """
+    moves = []
+    winner = None
+    colour = 'r'
+    with open(logPath) as log:
+        for line in log:
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) >= 5 and fields[2] == "turn_end":
+                match = ACTION_PATTERN.match(fields[4])
+                numbers = tuple(int(number) for number in match.group(2).split(","))
+                if match.group(1) == "SPAWN":
+                    moves.append(('spawn', numbers, colour))
+                else:
+                    moves.append(('spread', numbers[:2], numbers[2:]))
+                colour = ENEMY[colour]
+            elif len(fields) >= 4 and fields[2] == "game_end":
+                winner = {"winner:RED": 'r', "winner:BLUE": 'b'}.get(fields[3])
+    return (moves, winner)
+
+
+def learn(logPaths: list, path: str = BOOK_PATH):
+    """ Updates the book from finished games, see the top of this file """
+    book = OpeningBook(path)
+    entries = book.entries()
+    book.close()
+
+    for logPath in logPaths:
+        (moves, winner) = readGame(logPath)
+        if winner is None:
+            continue
+
+        board = newBoard()
+        for (ply, move) in enumerate(moves[:BOOK_PLIES]):
+            colour = 'r' if ply % 2 == 0 else 'b'
+            (key, transform) = bookKey(board, colour)
+            entry = entries.get(key)
+
+            lostWithBookMove = (
+                colour != winner and entry is not None
+                and fromCanonical(entry[0], transform) == move
+            )
+            if lostWithBookMove or (colour == winner and entry is None):
+                depth = LEARN_DEPTH if lostWithBookMove else BOOK_DEPTH
+                (bestMove, score) = searchPosition(board, colour, depth)
+                entries[key] = (toCanonical(bestMove, transform), score)
+
+            board.apply(move)
+
+    writeBook(entries, path)
+    print(f"{len(entries)} positions in the book")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="python -m agent.book")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    buildCommand = commands.add_parser("build", help="search the opening positions into a new book")
+    buildCommand.add_argument("--plies", type=int, default=BOOK_PLIES)
+    buildCommand.add_argument("--depth", type=int, default=BOOK_DEPTH)
+
+    learnCommand = commands.add_parser("learn", help="update the book from referee game logs")
+    learnCommand.add_argument("logs", nargs="+")
+
+    arguments = parser.parse_args()
+    if arguments.command == "build":
+        build(arguments.plies, arguments.depth)
+    else:
+        learn(arguments.logs)
@@ -1,20 +1,8 @@
-DIM = 7
-DIRECTIONS = ((1,-1), (1,0), (0,1), (-1,1), (-1,0), (0,-1))
-POWER_DISTANCE_COVERAGE = {1: (1,0,0), 2: (2,2,0), 3: (2,3,2), 4: (2,3,3), 5: (2,3,3), 6: (2,3,3)}
-
-
-def generateCoverageDict():
-    """
-    Initializes coverage of each position on the board for a particular player
-    """
+from collections import OrderedDict
 
-    coverage = {}
+from .board import Board, DIM, CELLS, MAX_POWER, DIRECTIONS, ENEMY, SIDE_TO_MOVE, cellIndex, iterBits
 
-    for i in range(DIM):
-        for j in range(DIM):
-            coverage[(i,j)] = 0
-
-    return coverage
+POWER_DISTANCE_COVERAGE = {1: (1,0,0), 2: (2,2,0), 3: (2,3,2), 4: (2,3,3), 5: (2,3,3), 6: (2,3,3)}
 
 
 def generateCoveragePositionPower():
@@ -66,62 +54,239 @@ def generateCoveragePositionPower():
 
 
 
+
+
+
 COVERAGE_POSITION_POWER = generateCoveragePositionPower()
 
 
-def getCoverages(board):
+def generateFootprints():
     """
-    Returns coverage for each colour for each position on the 7x7 board
+    Re-indexes COVERAGE_POSITION_POWER by [power][cell index] for the bitboard,
+    keeping only the cells that are actually covered at least once.
     """
+    footprints = [()]
 
-    redCoverage = generateCoverageDict()
-    blueCoverage = generateCoverageDict()
+    for power in range(1, MAX_POWER + 1):
+        byCell = [None] * CELLS
+        for i in range(DIM):
+            for j in range(DIM):
+                byCell[cellIndex((i, j))] = tuple(
+                    (cellIndex(coveredPosition), coveredTimes)
+                    for (coveredPosition, coveredTimes) in COVERAGE_POSITION_POWER[((i, j), power)].items()
+                    if coveredTimes
+                )
+        footprints.append(tuple(byCell))
 
-    for (position, (colour, power)) in board.items():
-        for (coveredPosition, coveredTimes) in COVERAGE_POSITION_POWER[(position, power)].items():
-            if colour == 'r':
-                redCoverage[coveredPosition] += coveredTimes
-            else:
-                blueCoverage[coveredPosition] += coveredTimes
+    return tuple(footprints)
+
+
+def generateReachMasks():
+    """
+    Generates, for each cell index, the mask of cells within three steps of it
+    in any direction. This is the area peaceful() treats as contested.
+    """
+    reachMasks = []
+
+    for i in range(DIM):
+        for j in range(DIM):
+            mask = 0
+            for coveredPosition in COVERAGE_POSITION_POWER[((i, j), 1)].keys():
+                mask |= 1 << cellIndex(coveredPosition)
+            reachMasks.append(mask)
+
+    return tuple(reachMasks)
+
+
+FOOTPRINTS = generateFootprints()
+REACH_MASKS = generateReachMasks()
+REACH_LISTS = tuple(tuple(iterBits(mask)) for mask in REACH_MASKS)
+
+
+
+################################################################################
+########################### Coverage State Class ###############################
+################################################################################
+
+class CoverageState:
+    """
+    Red and blue coverage of every cell, kept alongside a board and updated
+    by delta when a spawn or spread changes a few cells, rather than rebuilt
+    from every piece. It also counts how many pieces of each colour are
+    within reach of the other colour, which makes peaceful() O(1).
+    """
+    __slots__ = ("coverage", "reach", "owner", "power", "attacked")
+
+    def __init__(self, board: Board = None):
+        # weighted coverage of each cell by each colour
+        self.coverage = {'r': [0] * CELLS, 'b': [0] * CELLS}
+
+        # number of pieces of each colour that have each cell within reach
+        self.reach = {'r': [0] * CELLS, 'b': [0] * CELLS}
+
+        # the pieces the coverage was built from
+        self.owner = [None] * CELLS
+        self.power = [0] * CELLS
+
+        # number of pieces of each colour within reach of an enemy piece
+        self.attacked = {'r': 0, 'b': 0}
+
+        if board is not None:
+            for (index, colour, power) in board.pieces():
+                self.add(index, colour, power)
+
+    def add(self, index, colour, power):
+        """ Adds the footprint of a piece placed on an empty cell """
+        enemy = ENEMY[colour]
+        owner = self.owner
+        owner[index] = colour
+        self.power[index] = power
+
+        coverage = self.coverage[colour]
+        for (coveredIndex, coveredTimes) in FOOTPRINTS[power][index]:
+            coverage[coveredIndex] += coveredTimes
+
+        if self.reach[enemy][index]:
+            self.attacked[colour] += 1
+
+        reach = self.reach[colour]
+        for reachedIndex in REACH_LISTS[index]:
+            if not reach[reachedIndex] and owner[reachedIndex] == enemy:
+                self.attacked[enemy] += 1
+            reach[reachedIndex] += 1
+
+    def remove(self, index):
+        """ Subtracts the footprint of the piece on a cell and empties it """
+        owner = self.owner
+        colour = owner[index]
+        enemy = ENEMY[colour]
+
+        coverage = self.coverage[colour]
+        for (coveredIndex, coveredTimes) in FOOTPRINTS[self.power[index]][index]:
+            coverage[coveredIndex] -= coveredTimes
+
+        if self.reach[enemy][index]:
+            self.attacked[colour] -= 1
+
+        owner[index] = None
+        self.power[index] = 0
+
+        reach = self.reach[colour]
+        for reachedIndex in REACH_LISTS[index]:
+            reach[reachedIndex] -= 1
+            if not reach[reachedIndex] and owner[reachedIndex] == enemy:
+                self.attacked[enemy] -= 1
+
+    def update(self, changes):
+        """
+        Applies a list of (index, old colour, old power, new colour, new power)
+        cell changes, taking every old footprint off before adding the new ones
+        """
+        for (index, oldColour, _, _, _) in changes:
+            if oldColour is not None:
+                self.remove(index)
+        for (index, _, _, newColour, newPower) in changes:
+            if newColour is not None:
+                self.add(index, newColour, newPower)
+
+    def peaceful(self):
+        """ Checks if any captures can be made, in O(1) """
+        # reach is symmetric, so either colour being attacked means both are
+        return self.attacked['r'] == 0
+
+    def snapshot(self):
+        """ Returns a copy of the state for restore() """
+        return (
+            self.coverage['r'][:], self.coverage['b'][:],
+            self.reach['r'][:], self.reach['b'][:],
+            self.owner[:], self.power[:],
+            self.attacked['r'], self.attacked['b'],
+        )
+
+    def restore(self, snapshot):
+        """ Restores a snapshot in place, so existing references stay valid """
+        (self.coverage['r'][:], self.coverage['b'][:],
+         self.reach['r'][:], self.reach['b'][:],
+         self.owner[:], self.power[:],
+         self.attacked['r'], self.attacked['b']) = snapshot
+
+
+
+################################################################################
+######################## Evaluation and coverage ###############################
+################################################################################
+
+def getCoverages(board: Board):
+    """
+    Returns coverage for each colour for each cell index on the 7x7 board.
+    Boards with a coverage state return its lists, which must not be modified.
+    """
+
+    if board.coverage is not None:
+        return (board.coverage.coverage['r'], board.coverage.coverage['b'])
+
+    redCoverage = [0] * CELLS
+    blueCoverage = [0] * CELLS
+
+    for (index, colour, power) in board.pieces():
+        coverage = redCoverage if colour == 'r' else blueCoverage
+        for (coveredIndex, coveredTimes) in FOOTPRINTS[power][index]:
+            coverage[coveredIndex] += coveredTimes
 
     return (redCoverage, blueCoverage)
 
 
 
-def peaceful(board):
+def peaceful(board: Board):
     """
     Checks if any captures can be made in a position
     """
 
-    redCoverage = {}
-    blueCoverage = {}
+    if board.coverage is not None:
+        return board.coverage.peaceful()
 
-    # get coverages for each colour
-    for (position, (colour, power)) in board.items():
-        for (coveredPosition, coveredTimes) in COVERAGE_POSITION_POWER[(position, power)].items():
-            if colour == 'r':
-                if coveredPosition in redCoverage.keys():
-                    redCoverage[coveredPosition] += coveredTimes
-                else:
-                    redCoverage[coveredPosition] = coveredTimes
-            else:
-                if coveredPosition in blueCoverage.keys():
-                    blueCoverage[coveredPosition] += coveredTimes
-                else:
-                    blueCoverage[coveredPosition] = coveredTimes
-    
-    # if a piece is covered by the opponent, a capture is available
-    for (position, (colour, _)) in board.items():
-        if (position in redCoverage.keys() and colour == 'b' or 
-            position in blueCoverage.keys() and colour == 'r'):
+    # reach is symmetric, so it is enough to look from red's pieces
+    blue = board.blue
+    for index in iterBits(board.red):
+        if REACH_MASKS[index] & blue:
             return False
-    
+
     # no captures are available
     return True
 
 
 
-def evaluateAtkDef(board: dict[tuple, tuple], colourToMove):
+def evaluateAtkDef(board: Board, colourToMove):
+    """
+    evaluateAtkDef through the evaluation cache, for positions that are
+    scored more than once (e.g. at the leaves of successive iterations)
+    """
+    return cachedScores(board, colourToMove)[:2]
+
+
+
+def cachedScores(board: Board, colourToMove):
+    """ Returns scoreAtkDef of a position, from the evaluation cache if it is there """
+    key = board.key ^ SIDE_TO_MOVE[colourToMove]
+    cache = EVALUATION_CACHE
+
+    scores = cache.get(key)
+    if scores is None:
+        scores = scoreAtkDef(board, colourToMove)
+        cache.put(key, scores)
+    return scores
+
+
+
+# coverage lists scoreAtkDef fills for boards without a coverage state,
+# reused from call to call rather than allocated every time
+TO_MOVE_BUFFER = [0] * CELLS
+JUST_PLAYED_BUFFER = [0] * CELLS
+EMPTY_BUFFER = (0,) * CELLS
+
+
+
+def scoreAtkDef(board: Board, colourToMove):
     """
     Evaluation function of a position, based on coverage of nodes for each colour.
 
@@ -130,53 +295,192 @@ def evaluateAtkDef(board: dict[tuple, tuple], colourToMove):
 
     Secondary evaluation is used in the case of a tie in the primary evaluation,
     favouring the side who covers any node on the board more times overall.
+
+    Returns (primary, secondary, power balance), the balance being
+    evaluatePower's, which falls out of the same pass over the pieces.
   
-    # 1. generate two arrays 7x7 ? for both colours
+    # 1. get the coverage of all 49 cells for both colours
     # 2. go over every node, and add to positions covered and how many times based on colour
+    #    (unless the board keeps its coverage up to date already)
     # 3. go over every node again, but compare array coverages based on colour
             and add power based on who wins
     # 4. evaluate by the overall power of pieces covered first, but then after by overall coverage numbers
     """
 
-    # 1. 
-    colourToMoveCoverage = generateCoverageDict()
-    colourJustPlayedCoverage = generateCoverageDict()
-
-
     colourToMoveScore = 0
     maxJustPlayedPowerCoverage = 0
     secondaryOverlappingScore = 0
+    toMovePower = 0
+    justPlayedPower = 0
+
+    planes = board.planes
+    toMoveMask = board.colourMask(colourToMove)
+    justPlayedMask = board.colourMask(ENEMY[colourToMove])
+
+    # 1.
+    if board.coverage is not None:
+        colourToMoveCoverage = board.coverage.coverage[colourToMove]
+        colourJustPlayedCoverage = board.coverage.coverage[ENEMY[colourToMove]]
 
     # 2.
-    for (position, (colour, power)) in board.items():
-        for (coveredPosition, coveredTimes) in COVERAGE_POSITION_POWER[(position, power)].items():
-            if colour == colourToMove:
-                colourToMoveCoverage[coveredPosition] += coveredTimes
-            else:
-                colourJustPlayedCoverage[coveredPosition] += coveredTimes
+    else:
+        colourToMoveCoverage = TO_MOVE_BUFFER
+        colourJustPlayedCoverage = JUST_PLAYED_BUFFER
+        colourToMoveCoverage[:] = EMPTY_BUFFER
+        colourJustPlayedCoverage[:] = EMPTY_BUFFER
+        for power in range(1, MAX_POWER + 1):
+            for (mask, coverage) in ((planes[power] & toMoveMask, colourToMoveCoverage),
+                                     (planes[power] & justPlayedMask, colourJustPlayedCoverage)):
+                for index in iterBits(mask):
+                    for (coveredIndex, coveredTimes) in FOOTPRINTS[power][index]:
+                        coverage[coveredIndex] += coveredTimes
 
     # 3.
-    for (position, (defendingColour, power)) in board.items():
-        secondaryOverlappingScore += (colourToMoveCoverage[position] - colourJustPlayedCoverage[position])
-
-        if defendingColour == colourToMove:           
-            if colourToMoveCoverage[position] >= colourJustPlayedCoverage[position]:
+    for power in range(1, MAX_POWER + 1):
+        plane = planes[power]
+        if not plane:
+            continue
+
+        # defending colour is the colour to move
+        for index in iterBits(plane & toMoveMask):
+            toMove = colourToMoveCoverage[index]
+            justPlayed = colourJustPlayedCoverage[index]
+            secondaryOverlappingScore += toMove - justPlayed
+            toMovePower += power
+
+            if toMove >= justPlayed:
                 colourToMoveScore += power
-            # defending colour is the colour to move and a favourable capture can be made by the colour that just played
+            # a favourable capture can be made by the colour that just played
             else:
                 colourToMoveScore -= power
                 if power > maxJustPlayedPowerCoverage:
                     maxJustPlayedPowerCoverage = power
 
-        # defendingColour is the colour who just played
-        else: 
-            if colourJustPlayedCoverage[position] >= colourToMoveCoverage[position]:
+        # defending colour is the colour who just played
+        for index in iterBits(plane & justPlayedMask):
+            toMove = colourToMoveCoverage[index]
+            justPlayed = colourJustPlayedCoverage[index]
+            secondaryOverlappingScore += toMove - justPlayed
+            justPlayedPower += power
+
+            if justPlayed >= toMove:
                 colourToMoveScore -= power
             else:
                 colourToMoveScore += power
 
     # 4. 
     if colourToMove == 'r':
-        return (colourToMoveScore + maxJustPlayedPowerCoverage, secondaryOverlappingScore)
+        return (colourToMoveScore + maxJustPlayedPowerCoverage, secondaryOverlappingScore,
+                toMovePower - justPlayedPower)
     else:
-        return (-colourToMoveScore - maxJustPlayedPowerCoverage, -secondaryOverlappingScore)
\ No newline at end of file
+        return (-colourToMoveScore - maxJustPlayedPowerCoverage, -secondaryOverlappingScore,
+                justPlayedPower - toMovePower)
+
+
+
+def evaluateLeaf(board: Board, colourToMove, scored: bool = True):
+    """
+    The checks the search makes of a position, in one call. Returns
+    (lost, peaceful, balance, primary, secondary):
+      - lost, the colour with no pieces left (red checked first) or None
+      - peaceful, as peaceful()
+      - balance, as evaluatePower
+      - primary and secondary, as evaluateAtkDef
+    Once the game is over nothing else is worked out, and the scores are
+    only worked out if scored and the position isn't peaceful, and are None
+    otherwise. The scores and balance then come from a single pass over the
+    pieces (see scoreAtkDef) through the evaluation cache.
+    """
+    if not board.red:
+        return ('r', False, None, None, None)
+    if not board.blue:
+        return ('b', False, None, None, None)
+
+    if peaceful(board):
+        return (None, True, board.powerBalance(), None, None)
+    if not scored:
+        return (None, False, board.powerBalance(), None, None)
+
+    (primary, secondary, balance) = cachedScores(board, colourToMove)
+    return (None, False, balance, primary, secondary)
+
+
+
+################################################################################
+############################# Evaluation cache #################################
+################################################################################
+
+# scoreAtkDef results, keyed by the board's Zobrist key with the side to
+# move. The other checks at a node don't need caching: peaceful() is O(1)
+# with a coverage state and evaluatePower is a few bit counts, both cheaper
+# than a cache lookup. The cache holds a bounded number of entries and drops
+# the least recently used one when full. Its size comes from the memory the
+# referee says we have left (space_remaining, in MB, out of space_limit):
+# CACHE_SHARE of it at about ENTRY_BYTES per entry. Without a limit the
+# referee still reports space_remaining, as minus what we use, so it only
+# counts when space_limit is set; otherwise the cache gets CACHE_ENTRIES.
+# Under a limit with nothing left, it gets MIN_CACHE_ENTRIES.
+CACHE_ENTRIES = 1 << 17
+MIN_CACHE_ENTRIES = 1 << 10
+CACHE_SHARE = 0.25
+ENTRY_BYTES = 250
+
+
+def cacheEntries(spaceRemaining=None, spaceLimit=None):
+    """ Returns how many entries the evaluation cache may hold with the space the referee reports """
+    if spaceLimit is None or spaceLimit <= 0:
+        return CACHE_ENTRIES
+    space = spaceRemaining if spaceRemaining is not None else spaceLimit
+    entries = int(space * 1e6 * CACHE_SHARE / ENTRY_BYTES)
+    return max(MIN_CACHE_ENTRIES, min(CACHE_ENTRIES, entries))
+
+
+class EvaluationCache:
+    """
+    A least recently used cache of at most capacity entries, counting its
+    hits and misses so that its size can be tuned.
+    """
+
+    def __init__(self, capacity: int = CACHE_ENTRIES):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: int):
+        """ Returns the value cached for a key, or None """
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: int, value):
+        """ Caches a value, dropping the least recently used entry if full """
+        entries = self.entries
+        entries[key] = value
+        if len(entries) > self.capacity:
+            entries.popitem(last=False)
+
+    def resize(self, capacity: int):
+        """ Changes the capacity, dropping the least recently used entries that no longer fit """
+        self.capacity = capacity
+        entries = self.entries
+        while len(entries) > capacity:
+            entries.popitem(last=False)
+
+    def clear(self):
+        """ Empties the cache and its counters """
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def hitRate(self):
+        """ Returns the share of lookups that were hits """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+EVALUATION_CACHE = EvaluationCache()
@@ -0,0 +1,359 @@
+# COMP30024 Artificial Intelligence, Semester 1 2023
+# Project Part B: Game Playing Agent
+
+# A Monte Carlo tree search agent, as an alternative to minimax. Play it from
+# the referee as agent:MCTSAgent. Each iteration:
+#   - selects a path down the tree by PUCT, trading off how good a move has
+#     been so far against its prior and how rarely it has been tried
+#   - expands the node it stops at, giving every move a prior from the
+#     evaluateAtkDef score of the position it leads to
+#   - scores the new leaf (a win, loss or draw if the game is over there,
+#     otherwise the evaluateAtkDef score squashed into a win probability,
+#     optionally mixed with the results of random playouts)
+#   - backs that score up the path
+# and the move played is the root move visited the most.
+#
+# Every spread of a node is a child from the start, but spawns are let in
+# one at a time in order of prior as the node gets more visits (progressive
+# widening), since there can be dozens of them and most are poor.
+#
+# The tree is stored as parallel arrays indexed by node number rather than as
+# node objects. It is kept between moves: when an action is played, the
+# child it leads to becomes the new root with everything under it, so the
+# next search starts from the statistics of the last one rather than from
+# scratch.
+
+import math
+from array import array
+
+from referee.game import \
+    PlayerColor, Action, SpawnAction, SpreadAction, HexPos, HexDir
+from .board import Board, FULL_MASK, MAX_BOARD_POW, MAX_TURNS, WIN_POWER_DIFF, DIRECTIONS, ENEMY, \
+    cellPosition, iterBits
+from .coverage import CoverageState, evaluateAtkDef
+from .batch import boardArrays, childArrays, evaluateBatch
+from .timing import SearchClock, moveBudget
+from .playouts import playoutValue
+
+# exploration constant of PUCT
+C_PUCT = 1.5
+
+# a node lets in WIDEN_BASE * visits ** WIDEN_EXPONENT spawns (at least one)
+WIDEN_BASE = 1.5
+WIDEN_EXPONENT = 0.5
+
+# priors are a softmax of evaluateAtkDef scores at this temperature, and leaf
+# scores are squashed into win probabilities on this scale
+PRIOR_TEMPERATURE = 2.0
+VALUE_SCALE = 6.0
+
+# iterations per move when the referee gives no time limit
+ITERATIONS = 2000
+
+# random playouts (see playouts.py) averaged into each leaf's score, or 0 to
+# score leaves with evaluateAtkDef alone
+PLAYOUTS = 0
+
+################################################################################
+############################## Agent Class #####################################
+################################################################################
+
+class MCTSAgent:
+    def __init__(self, color: PlayerColor, **referee: dict):
+        """
+        Initialise the agent.
+        """
+        self.colour = None
+        self.board = Board()
+        self.board.coverage = CoverageState(self.board)
+        self.turns = 0
+
+        # the tree of the last search, rooted at the current position, or
+        # None if the game left it
+        self.tree = None
+
+        match color:
+            case PlayerColor.RED:
+                self.colour = 'r'
+            case PlayerColor.BLUE:
+                self.colour = 'b'
+
+    def action(self, **referee: dict) -> Action:
+        """
+        Return the next action to take.
+        """
+        budget = moveBudget(referee.get("time_remaining"), self.turns)
+        if self.tree is None:
+            self.tree = SearchTree(self.board, self.colour, self.turns)
+        next_move = self.tree.search(budget)
+
+        if (next_move[0] == 'spread'):
+            return SpreadAction(HexPos(next_move[1][0], next_move[1][1]), HexDir(next_move[2]))
+        else:
+            return SpawnAction(HexPos(next_move[1][0], next_move[1][1]))
+
+    def turn(self, color: PlayerColor, action: Action, **referee: dict):
+        """
+        Update the agent with the last player's action.
+        """
+        self.turns += 1
+
+        match action:
+            case SpawnAction(cell):
+                c = 'r'
+                if (color == PlayerColor.BLUE):
+                    c = 'b'
+                self.board.spawn((cell.r, cell.q), c)
+                move = ('spawn', (cell.r, cell.q), c)
+            case SpreadAction(cell, direction):
+                self.board.spread((cell.r, cell.q), (direction.value.r, direction.value.q))
+                move = ('spread', (cell.r, cell.q), (direction.value.r, direction.value.q))
+
+        # keep the part of the tree under the action
+        if self.tree is not None and not self.tree.advance(move):
+            self.tree = None
+
+################################################################################
+############################## Game rules ######################################
+################################################################################
+
+def outcome(board: Board, turnCount: int):
+    """
+    Returns red's result (1 for a win, 0 for a loss, 0.5 for a draw) if the
+    game is over after turnCount actions, or None if it isn't. A game ends on
+    MAX_TURNS or when a colour has no pieces left, and is only won by at
+    least WIN_POWER_DIFF power, as in the referee's Board.winner_color.
+    """
+    if turnCount < 2:
+        return None
+    if turnCount < MAX_TURNS and board.red and board.blue:
+        return None
+
+    balance = board.powerBalance()
+    if abs(balance) < WIN_POWER_DIFF:
+        return 0.5
+    return 1.0 if balance > 0 else 0.0
+
+
+def candidateMoves(board: Board, colourToMove):
+    """ Returns every spread and every spawn of the colour to move, as two lists """
+    spreads = []
+    for index in iterBits(board.colourMask(colourToMove)):
+        position = cellPosition(index)
+        for direction in DIRECTIONS:
+            spreads.append(('spread', position, direction))
+
+    spawns = []
+    if board.totalPower() < MAX_BOARD_POW:
+        for index in iterBits(FULL_MASK & ~board.occupied()):
+            spawns.append(('spawn', cellPosition(index), colourToMove))
+
+    return (spreads, spawns)
+
+
+def priors(board: Board, colourToMove, moves: list):
+    """ Returns a softmax over the evaluateAtkDef scores of the children moves lead to """
+    (owner, power) = boardArrays(board)
+    (owners, powers) = childArrays(owner, power, moves)
+    primary = evaluateBatch(owners, powers, ENEMY[colourToMove])[0]
+
+    # scores are red's, so blue prefers them low
+    scores = (primary if colourToMove == 'r' else -primary).tolist()
+    best = max(scores)
+    weights = [math.exp((score - best) / PRIOR_TEMPERATURE) for score in scores]
+    total = sum(weights)
+    return [weight / total for weight in weights]
+
+
+def leafValue(board: Board, colourToMove):
+    """ Returns red's estimated chance of winning from evaluateAtkDef """
+    score = evaluateAtkDef(board, colourToMove)[0]
+    return 1 / (1 + math.exp(-score / VALUE_SCALE))
+
+################################################################################
+############################# Search tree ######################################
+################################################################################
+
+class SearchTree:
+    """
+    A search tree for one move. Node i has:
+      - move[i], the move into it from its parent (None at the root), made
+        by mover[i]
+      - parent[i], the parent's node number (-1 at the root)
+      - visits[i] and value[i], the number of times it was visited and the
+        sum of the results of those visits for mover[i]
+      - prior[i], its parent's prior for its move
+      - children[i], the numbers of the children let in so far, or None
+        before it is expanded, of which the first spreads[i] are spreads,
+        and spawns[i], the spawns not let in yet (best prior last) with
+        their priors
+    Node 0 is the root.
+    """
+
+    def __init__(self, board: Board, colour, turnCount: int):
+        self.board = board
+        self.colour = colour
+        self.turnCount = turnCount
+
+        self.move = []
+        self.mover = []
+        self.parent = array('l')
+        self.visits = array('l')
+        self.value = array('d')
+        self.prior = array('d')
+        self.children = []
+        self.spreads = array('l')
+        self.spawns = []
+
+        self.addNode(None, ENEMY[colour], -1, 1.0)
+
+    def addNode(self, move, mover, parent: int, prior: float):
+        """ Adds an unvisited node and returns its number """
+        self.move.append(move)
+        self.mover.append(mover)
+        self.parent.append(parent)
+        self.visits.append(0)
+        self.value.append(0.0)
+        self.prior.append(prior)
+        self.children.append(None)
+        self.spreads.append(0)
+        self.spawns.append(None)
+        return len(self.move) - 1
+
+    def expand(self, node: int):
+        """ Lets in every spread of a node and works out the priors of its spawns """
+        colourToMove = ENEMY[self.mover[node]]
+        (spreads, spawns) = candidateMoves(self.board, colourToMove)
+        moves = spreads + spawns
+        movePriors = priors(self.board, colourToMove, moves)
+
+        self.children[node] = [
+            self.addNode(move, colourToMove, node, p)
+            for (move, p) in zip(spreads, movePriors)
+        ]
+        self.spreads[node] = len(spreads)
+
+        # kept sorted so that the next spawn to let in is popped off the end
+        pending = list(zip(movePriors[len(spreads):], spawns))
+        pending.sort(key=lambda spawn: spawn[0])
+        self.spawns[node] = pending
+
+    def widen(self, node: int):
+        """ Lets in another spawn if the node has been visited enough for it """
+        pending = self.spawns[node]
+        if not pending:
+            return
+
+        children = self.children[node]
+        allowed = max(1, int(WIDEN_BASE * self.visits[node] ** WIDEN_EXPONENT))
+        if len(children) - self.spreads[node] < allowed:
+            (p, move) = pending.pop()
+            children.append(self.addNode(move, ENEMY[self.mover[node]], node, p))
+
+    def select(self, node: int):
+        """ Returns the child of a node with the highest PUCT score """
+        visits = self.visits
+        value = self.value
+        prior = self.prior
+        explore = C_PUCT * math.sqrt(visits[node] + 1)
+
+        best = None
+        bestScore = -math.inf
+        for child in self.children[node]:
+            n = visits[child]
+            q = value[child] / n if n else 0.5
+            score = q + explore * prior[child] / (1 + n)
+            if score > bestScore:
+                best = child
+                bestScore = score
+        return best
+
+    def iterate(self):
+        """ Runs one select, expand, evaluate and backpropagate iteration """
+        board = self.board
+        node = 0
+        path = [0]
+        tokens = []
+
+        # walk down until a node that hasn't been visited, or the end of the game
+        result = outcome(board, self.turnCount)
+        while result is None and (node == 0 or self.visits[node] > 0):
+            if self.children[node] is None:
+                self.expand(node)
+            self.widen(node)
+
+            node = self.select(node)
+            tokens.append(board.apply(self.move[node]))
+            path.append(node)
+            result = outcome(board, self.turnCount + len(tokens))
+
+        if result is None:
+            result = leafValue(board, ENEMY[self.mover[node]])
+            if PLAYOUTS:
+                played = playoutValue(board, ENEMY[self.mover[node]], self.turnCount + len(tokens), PLAYOUTS)
+                result = (result + played) / 2
+
+        for token in reversed(tokens):
+            board.undo(token)
+
+        # result is red's, each node keeps its mover's
+        for node in path:
+            self.visits[node] += 1
+            self.value[node] += result if self.mover[node] == 'r' else 1 - result
+
+    def advance(self, move):
+        """
+        Makes the child a move leads to the root, keeping the statistics of
+        everything under it and dropping the rest, after the move is played
+        on the board. Returns False, leaving the tree as it was, if the move
+        isn't in the tree.
+        """
+        found = [child for child in self.children[0] or () if self.move[child] == move]
+        if not found:
+            return False
+
+        # number the subtree's nodes breadth first, so parents keep coming
+        # before their children
+        order = [found[0]]
+        number = {found[0]: 0}
+        for node in order:
+            for child in self.children[node] or ():
+                number[child] = len(order)
+                order.append(child)
+
+        self.move = [self.move[node] for node in order]
+        self.move[0] = None
+        self.mover = [self.mover[node] for node in order]
+        self.parent = array('l', (number.get(self.parent[node], -1) for node in order))
+        self.visits = array('l', (self.visits[node] for node in order))
+        self.value = array('d', (self.value[node] for node in order))
+        self.prior = array('d', (self.prior[node] for node in order))
+        self.children = [
+            None if self.children[node] is None else [number[child] for child in self.children[node]]
+            for node in order
+        ]
+        self.spreads = array('l', (self.spreads[node] for node in order))
+        self.spawns = [self.spawns[node] for node in order]
+
+        self.colour = ENEMY[self.colour]
+        self.turnCount += 1
+        return True
+
+    def search(self, budget=None):
+        """
+        Iterates until the budget (CPU seconds, or None for ITERATIONS
+        iterations) runs out and returns the most visited root move.
+        """
+        clock = SearchClock(budget)
+
+        # the root always gets its children so there is a move to play
+        if self.children[0] is None:
+            self.expand(0)
+        self.widen(0)
+        iterations = 0
+        while not clock.expired() if budget is not None else iterations < ITERATIONS:
+            self.iterate()
+            iterations += 1
+
+        best = max(self.children[0], key=lambda child: (self.visits[child], self.prior[child]))
+        return self.move[best]
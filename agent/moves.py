@@ -0,0 +1,255 @@
+# COMP30024 Artificial Intelligence, Semester 1 2023
+# Project Part B: Game Playing Agent
+
+# Staged move generation for the search. Rather than building and scoring
+# every child of a position and then keeping BREADTH of them, moves are
+# yielded lazily, one kind at a time and the most forcing kind first:
+#   1. the transposition table's best move
+#   2. captures: spreads that land on at least one enemy piece
+#   3. self-stacks: spreads that land on our own pieces (and no enemy ones),
+#      raising the power of our stacks
+#   4. spawns on cells we cover at least as much as the enemy does
+#   5. quiet spreads that only land on empty cells
+# A stage is only built once the search asks for more moves than the earlier
+# stages gave it. Its candidates are ranked by what the search has learned
+# (see ordering.py): the ply's killer moves first, then by history score.
+# The batched evaluator only scores the candidates tied on the last place in
+# the stage's share of the beam, and picks the best of them out with heapq.
+# Near the root every tie is broken by the evaluator, since the order of the
+# first moves matters most there. When the search cuts off, the generator is
+# dropped and the later stages are never built.
+
+import heapq
+
+from .board import Board, FULL_MASK, MAX_POWER, MAX_BOARD_POW, DIRECTIONS, DIRECTION_INDEX, ENEMY, SPREAD_MASKS, \
+    cellIndex, cellPosition, iterBits
+from .coverage import getCoverages
+from .batch import boardArrays, childArrays, evaluateBatch
+
+# kinds of spread, by what they land on
+CAPTURE = 0
+SELF_STACK = 1
+QUIET = 2
+
+# how much a capture swings the power balance for each enemy stack it lands
+# on, by that stack's power: the enemy loses the stack and we gain it plus one,
+# less the one we would have put on an empty cell, and a stack at MAX_POWER
+# is removed instead
+CAPTURE_SWING = (0, 2, 4, 6, 8, 10, 5)
+
+# how many moves of the beam each stage may take, in stage order (captures,
+# self-stacks, spawns, quiet spreads). A stage with fewer candidates than its
+# share passes what it didn't use on to the next stage.
+STAGE_BREADTH = (2, 1, 2, 1)
+
+# plies from the root within which the evaluator breaks every tie in a
+# stage's ranking, not just the ones that decide which moves make the beam
+EVALUATED_PLIES = 2
+
+
+def spreadKind(landed: int, own: int, enemy: int):
+    """ Classifies a spread by the mask of cells it lands on """
+    if landed & enemy:
+        return CAPTURE
+    if landed & own:
+        return SELF_STACK
+    return QUIET
+
+
+def spreadMoves(state: Board, own: int, enemy: int, kind: int):
+    """ Returns the spreads of the colour with occupancy mask own of one kind """
+    moves = []
+    planes = state.planes
+
+    for power in range(1, MAX_POWER + 1):
+        for index in iterBits(planes[power] & own):
+            masks = SPREAD_MASKS[index]
+            position = cellPosition(index)
+            for (d, direction) in enumerate(DIRECTIONS):
+                if spreadKind(masks[d][power], own, enemy) == kind:
+                    moves.append(('spread', position, direction))
+
+    return moves
+
+
+def captureMoves(state: Board, colourToMove):
+    """
+    Returns (gain, move) for every capture of the colour to move, largest gain
+    first, where gain is how much the capture swings the power balance its way.
+    """
+    own = state.colourMask(colourToMove)
+    enemy = state.colourMask(ENEMY[colourToMove])
+    planes = state.planes
+    enemyPlanes = [planes[power] & enemy for power in range(MAX_POWER + 1)]
+
+    captures = []
+    for power in range(1, MAX_POWER + 1):
+        for index in iterBits(planes[power] & own):
+            masks = SPREAD_MASKS[index]
+            position = cellPosition(index)
+            for (d, direction) in enumerate(DIRECTIONS):
+                landed = masks[d][power]
+                if landed & enemy:
+                    gain = 0
+                    for captured in range(1, MAX_POWER + 1):
+                        gain += CAPTURE_SWING[captured] * (enemyPlanes[captured] & landed).bit_count()
+                    captures.append((gain, ('spread', position, direction)))
+
+    captures.sort(key=lambda capture: capture[0], reverse=True)
+    return captures
+
+
+def spawnMoves(state: Board, colourToMove):
+    """ Returns the spawns on empty cells the colour to move covers at least as much as the enemy """
+    if state.totalPower() >= MAX_BOARD_POW:
+        return []
+
+    (redCoverage, blueCoverage) = getCoverages(state)
+    if colourToMove == 'r':
+        (playerCoverage, enemyCoverage) = (redCoverage, blueCoverage)
+    else:
+        (playerCoverage, enemyCoverage) = (blueCoverage, redCoverage)
+
+    moves = []
+    for index in iterBits(FULL_MASK & ~state.occupied()):
+        if playerCoverage[index] >= enemyCoverage[index]:
+            moves.append(('spawn', cellPosition(index), colourToMove))
+
+    return moves
+
+
+def allMoves(state: Board, colourToMove):
+    """ Returns every legal move of the colour to move, spreads first, unranked """
+    moves = []
+    for index in iterBits(state.colourMask(colourToMove)):
+        position = cellPosition(index)
+        for direction in DIRECTIONS:
+            moves.append(('spread', position, direction))
+
+    if state.totalPower() < MAX_BOARD_POW:
+        for index in iterBits(FULL_MASK & ~state.occupied()):
+            moves.append(('spawn', cellPosition(index), colourToMove))
+
+    return moves
+
+
+def isLegal(state: Board, colourToMove, move):
+    """ Checks that a move (e.g. from the transposition table) can be played here """
+    index = cellIndex(move[1])
+    if move[0] == 'spread':
+        return state.colourAt(index) == colourToMove
+    return (move[2] == colourToMove and state.colourAt(index) is None
+            and state.totalPower() < MAX_BOARD_POW)
+
+
+def isCapture(state: Board, colourToMove, move):
+    """ Checks whether a move is a spread that lands on an enemy piece """
+    if move[0] != 'spread':
+        return False
+    index = cellIndex(move[1])
+    landed = SPREAD_MASKS[index][DIRECTION_INDEX[move[2]]][state.powerAt(index)]
+    return bool(landed & state.colourMask(ENEMY[colourToMove]))
+
+
+def bestMoves(state: Board, colourToMove, candidates: list, k: int, arrays: list, byPower=False):
+    """
+    Returns the k best candidates, best first, scored by evaluateAtkDef of the
+    child from the side of the colour to move next. byPower ranks by the
+    power balance first, so the biggest captures come first.
+    arrays caches the owner and power arrays of the position between stages.
+    """
+    if not arrays:
+        arrays.extend(boardArrays(state))
+
+    (owners, powers) = childArrays(arrays[0], arrays[1], candidates)
+    (primary, secondary, powerBalance) = evaluateBatch(owners, powers, ENEMY[colourToMove])
+
+    # heapq picks the smallest keys, so flip the scores when red is choosing
+    sign = -1 if colourToMove == 'r' else 1
+    primary = (sign * primary).tolist()
+    secondary = (sign * secondary).tolist()
+
+    if byPower:
+        powerBalance = (sign * powerBalance).tolist()
+        key = lambda i: (powerBalance[i], primary[i], secondary[i])
+    else:
+        key = lambda i: (primary[i], secondary[i])
+
+    # nsmallest keeps the candidates' order between equal keys
+    return [candidates[i] for i in heapq.nsmallest(k, range(len(candidates)), key=key)]
+
+
+def rankedMoves(state: Board, colourToMove, candidates: list, k: int, arrays: list, byPower: bool,
+                ordering, ply: int):
+    """
+    Returns the k best candidates, best first: killer moves of the ply, then
+    the rest by their history scores in ordering. The evaluator (see
+    bestMoves) only ranks candidates tied on the lowest score that makes the
+    k, or that are within EVALUATED_PLIES of the root.
+    """
+    if ordering is None:
+        return bestMoves(state, colourToMove, candidates, k, arrays, byPower)
+
+    killers = ordering.killerMoves(ply)
+    history = [ordering.score(colourToMove, move) for move in candidates]
+    if not any(history) and not any(move in killers for move in candidates):
+        return bestMoves(state, colourToMove, candidates, k, arrays, byPower)
+
+    scores = {move: (move in killers, score) for (move, score) in zip(candidates, history)}
+
+    # near the root, sorting the evaluator's order by score breaks every tie
+    if ply < EVALUATED_PLIES:
+        evaluated = bestMoves(state, colourToMove, candidates, len(candidates), arrays, byPower)
+        return sorted(evaluated, key=scores.get, reverse=True)[:k]
+
+    ranked = sorted(candidates, key=scores.get, reverse=True)
+    threshold = scores[ranked[min(k, len(ranked)) - 1]]
+    ahead = [move for move in ranked if scores[move] > threshold]
+    tied = [move for move in ranked if scores[move] == threshold]
+    if len(tied) > k - len(ahead):
+        tied = bestMoves(state, colourToMove, tied, k - len(ahead), arrays, byPower)
+    return ahead + tied[:k - len(ahead)]
+
+
+def generateMoves(state: Board, colourToMove, tableMove=None, breadth=sum(STAGE_BREADTH),
+                  ordering=None, ply: int = 0):
+    """
+    Yields up to breadth moves for the colour to move, stage by stage. The
+    board may be changed between yields as long as it is restored before
+    asking for the next move. ordering is the searcher's MoveOrdering, and
+    ply how many actions from the root this position is.
+    """
+    yielded = 0
+    if tableMove is not None and isLegal(state, colourToMove, tableMove):
+        yield tableMove
+        yielded += 1
+
+    own = state.colourMask(colourToMove)
+    enemy = state.colourMask(ENEMY[colourToMove])
+    arrays = []
+
+    # each stage builds its candidates and says whether to rank them by power
+    stages = (
+        (lambda: spreadMoves(state, own, enemy, CAPTURE), True),
+        (lambda: spreadMoves(state, own, enemy, SELF_STACK), False),
+        (lambda: spawnMoves(state, colourToMove), False),
+        (lambda: spreadMoves(state, own, enemy, QUIET), False),
+    )
+
+    share = 0
+    for ((build, byPower), stageBreadth) in zip(stages, STAGE_BREADTH):
+        share += stageBreadth
+        k = min(share, breadth - yielded)
+        if k <= 0:
+            return
+
+        candidates = build()
+        if tableMove in candidates:
+            candidates.remove(tableMove)
+        if not candidates:
+            continue
+
+        for move in rankedMoves(state, colourToMove, candidates, k, arrays, byPower, ordering, ply):
+            yield move
+            yielded += 1
+            share -= 1
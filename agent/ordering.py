@@ -0,0 +1,73 @@
+# COMP30024 Artificial Intelligence, Semester 1 2023
+# Project Part B: Game Playing Agent
+
+# Move ordering learned from the search itself, which generateMoves consults
+# before it scores anything with the evaluator. Two heuristics:
+#   - killer moves: the last KILLER_SLOTS moves that caused a cutoff at each
+#     ply. Positions at the same ply are usually siblings that differ in one
+#     move, so a move that refuted one of them often refutes the others.
+#   - the history table: for every (colour, action kind, cell, direction),
+#     the sum of depth * depth over the cutoffs that move has caused anywhere
+#     in the tree, so moves that keep refuting deep subtrees come first.
+# The killers are cleared for every search, since their plies are counted
+# from the root, and the history is halved so that it follows the game
+# without forgetting everything it has learned.
+
+from .board import CELLS, DIRECTIONS, DIRECTION_INDEX, cellIndex
+
+# killer moves kept per ply, and the deepest ply they are kept for
+KILLER_SLOTS = 2
+MAX_PLY = 64
+
+# the action kinds of the history table. A spawn has no direction, so it is
+# counted under the first one
+SPAWN = 0
+SPREAD = 1
+
+COLOURS = ('r', 'b')
+HISTORY_SIZE = len(COLOURS) * 2 * CELLS * len(DIRECTIONS)
+
+
+def historyIndex(colour, move):
+    """ Returns the slot of the history table for a move of colour """
+    kind = SPREAD if move[0] == 'spread' else SPAWN
+    direction = DIRECTION_INDEX[move[2]] if kind == SPREAD else 0
+    return ((COLOURS.index(colour) * 2 + kind) * CELLS + cellIndex(move[1])) * len(DIRECTIONS) + direction
+
+
+class MoveOrdering:
+    """ The killer moves and history table of one searcher """
+
+    def __init__(self):
+        self.history = [0] * HISTORY_SIZE
+        self.killers = [[None] * KILLER_SLOTS for _ in range(MAX_PLY)]
+
+    def clear(self):
+        """ Forgets everything """
+        self.history = [0] * HISTORY_SIZE
+        self.killers = [[None] * KILLER_SLOTS for _ in range(MAX_PLY)]
+
+    def newSearch(self):
+        """ Clears the killers and halves the history, before searching a new position """
+        self.history = [score >> 1 for score in self.history]
+        self.killers = [[None] * KILLER_SLOTS for _ in range(MAX_PLY)]
+
+    def score(self, colour, move):
+        """ Returns the history score of a move of colour """
+        return self.history[historyIndex(colour, move)]
+
+    def killerMoves(self, ply: int):
+        """ Returns the killer moves of a ply, most recent first """
+        if ply >= MAX_PLY:
+            return []
+        return [move for move in self.killers[ply] if move is not None]
+
+    def cutoff(self, colour, move, depth: int, ply: int):
+        """ Records a move of colour that caused a cutoff with depth actions left, ply actions from the root """
+        self.history[historyIndex(colour, move)] += depth * depth
+
+        if ply < MAX_PLY:
+            killers = self.killers[ply]
+            if killers[0] != move:
+                killers.pop()
+                killers.insert(0, move)
@@ -0,0 +1,253 @@
+# COMP30024 Artificial Intelligence, Semester 1 2023
+# Project Part B: Game Playing Agent
+
+# Root-parallel search. The children of the root are independent searches,
+# so on a machine with more than one core they are handed out to a pool of
+# worker processes, one child per task and in the root's move order. Each
+# worker keeps its own minimax for the whole game, but clears its table and
+# move ordering for every child, so that a child's score doesn't depend on
+# which worker (and which of its earlier tasks) it happened to get.
+#
+# That determinism has a price. A child starts with an empty table and no
+# killers or history, so nothing carries over between iterations or moves
+# (the principal variation the sequential search keeps between turns only
+# reaches the root), and the root is searched without aspiration windows.
+# The move it plays can differ from the sequential search's for the same
+# reason. With two workers at depth 4 on midgame positions it searched 1.3
+# to 1.8 times the nodes of one process, so it is off by default
+# (WORKERS = 1 in program.py).
+#
+# Every task carries the wall clock time the iteration must finish by, so
+# that an iteration takes no longer than the move's budget however many
+# children each worker ends up with.
+#
+# Workers share the root mover's best score so far through a shared-memory
+# Value: a child started after an earlier one finished is searched with that
+# score as its bound, so it can be cut off as soon as it can't beat it. The
+# results are combined in root move order, so the move played does not depend
+# on which worker finished first.
+
+import atexit
+import math
+import multiprocessing
+import os
+import sys
+import time
+from multiprocessing import shared_memory
+
+from .timing import SearchClock, SearchTimeout
+from .transposition import SharedTranspositionTable, sharedTableBytes
+
+# workers search with a bound this much worse than the best score so far.
+# Scores are whole numbers, so a child that ties the best is still scored
+# exactly, and ties go to the earlier root move as in the sequential search
+TIE_MARGIN = 1
+
+
+def availableCores():
+    """ Returns the number of cores this process may run on """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+# state of a worker process, set up by initWorker
+_best = None
+_searcher = None
+
+
+def initWorker(best, searcherClass):
+    """ Sets up a worker with the shared best score and a searcher of its own """
+    global _best, _searcher
+    _best = best
+    _searcher = searcherClass()
+
+
+def searchRootMove(task):
+    """
+    Searches one child of the root in a worker. Returns (score, exact, nodes),
+    where exact is False if the score is only a bound because the child could
+    not beat the best score so far, or None if the budget ran out.
+    """
+    (board, colour, move, depth, deadline) = task
+
+    _searcher.table.clear()
+    _searcher.ordering.clear()
+    budget = None if deadline is None else max(0, deadline - time.time())
+    _searcher.clock = SearchClock(budget, time.time)
+    _searcher.nodes = 0
+
+    # the shared value is the best score so far with red's scores as they
+    # are and blue's negated, so both colours want to raise it
+    sign = 1 if colour == 'r' else -1
+    best = _best.value
+    if colour == 'r':
+        (alpha, beta) = (best - TIE_MARGIN, math.inf)
+    else:
+        (alpha, beta) = (-math.inf, -best + TIE_MARGIN)
+
+    try:
+        score = _searcher.score_move(board, colour, move, depth, alpha, beta)
+    except SearchTimeout:
+        return None
+
+    exact = alpha < score < beta
+    if exact:
+        with _best.get_lock():
+            if sign * score > _best.value:
+                _best.value = sign * score
+
+    return (score, exact, _searcher.nodes)
+
+
+class RootPool:
+    """
+    A persistent pool of worker processes that search the children of the
+    root in parallel, created once per game in Agent.__init__.
+    """
+
+    def __init__(self, searcherClass, workers: int):
+        self.best = multiprocessing.Value('d', -math.inf)
+
+        # the referee replaces our stdin with an object that can't be closed,
+        # which new processes try to do, so hide it while they start
+        stdin = sys.stdin
+        sys.stdin = None
+        try:
+            self.pool = multiprocessing.Pool(
+                workers, initializer=initWorker, initargs=(self.best, searcherClass)
+            )
+        finally:
+            sys.stdin = stdin
+
+    def searchRoot(self, board, colour, moves: list, depth: int, clock: SearchClock):
+        """
+        Searches every root move to depth and returns (best move, best score,
+        nodes). Raises SearchTimeout if any child ran out of budget.
+        """
+        self.best.value = -math.inf
+        budget = clock.remaining()
+        deadline = None if budget is None else time.time() + budget
+        tasks = [(board, colour, move, depth, deadline) for move in moves]
+        results = self.pool.map(searchRootMove, tasks, chunksize=1)
+
+        if any(result is None for result in results):
+            raise SearchTimeout()
+
+        # only exact scores compete, earliest root move first on ties
+        sign = 1 if colour == 'r' else -1
+        bestMove = moves[0]
+        bestScore = None
+        nodes = 0
+        for (move, (score, exact, childNodes)) in zip(moves, results):
+            nodes += childNodes
+            if exact and (bestScore is None or sign * score > sign * bestScore):
+                bestMove = move
+                bestScore = score
+
+        if bestScore is None:
+            bestScore = results[0][0]
+
+        return (bestMove, bestScore, nodes)
+
+    def close(self):
+        """ Stops the workers """
+        self.pool.terminate()
+
+
+################################################################################
+############################### Lazy SMP #######################################
+################################################################################
+
+# Lazy SMP. Rather than splitting the root, helper processes search the whole
+# tree alongside the main search, and they share nothing but one transposition
+# table in shared memory. What a helper finds shows up as table hits and move
+# ordering for the others. Helpers are made to diverge a little: each takes
+# the root moves in a different order (rotated by its number), and odd helpers
+# start iterating one ply deeper. Only the main search's move is played. This
+# keeps every core busy even when the root has a single good move, where
+# splitting the root leaves most workers idle once they are cut off.
+
+# helper state in a helper process, set up by initHelper
+_stop = None
+
+
+def initHelper(stop, buffer, searcherClass, helper: int):
+    """ Sets up a helper process with the shared stop flag and table """
+    global _stop, _searcher
+    _stop = stop
+    _searcher = searcherClass()
+    _searcher.table = SharedTranspositionTable(buffer, owner=False)
+    _searcher.helper = helper
+
+
+def helpSearch(task):
+    """ Searches the root in a helper until the budget runs out or the main search stops it """
+    (board, colour, budget) = task
+
+    # a helper never sees the moves played, so the line its last search
+    # left would be seeded into the shared table at the wrong root
+    _searcher.pv = []
+    _searcher.search(board, colour, budget, stop=_stop)
+    return _searcher.nodes
+
+
+class SmpPool:
+    """
+    Helper processes for a Lazy SMP search and the shared memory table they
+    search with, created once per game in Agent.__init__. The main search
+    uses the pool's table too.
+    """
+
+    def __init__(self, searcherClass, helpers: int):
+        self.memory = shared_memory.SharedMemory(create=True, size=sharedTableBytes())
+        self.table = SharedTranspositionTable(self.memory.buf)
+        self.table.clear()
+        self.stop = multiprocessing.Value('b', 0, lock=False)
+
+        # one single-process pool per helper, so that each can be told apart.
+        # Helpers are forked so that they inherit the shared memory block
+        # rather than opening it again (see RootPool for why stdin is hidden)
+        context = multiprocessing.get_context("fork")
+        stdin = sys.stdin
+        sys.stdin = None
+        try:
+            self.helpers = [
+                context.Pool(
+                    1, initializer=initHelper,
+                    initargs=(self.stop, self.memory.buf, searcherClass, helper)
+                )
+                for helper in range(1, helpers + 1)
+            ]
+        finally:
+            sys.stdin = stdin
+
+        atexit.register(self.close)
+
+    def search(self, searcher, board, colour, budget):
+        """
+        Runs the searcher's search with the helpers searching alongside it,
+        and returns its move once it and the helpers have stopped.
+        """
+        self.stop.value = 0
+        running = [helper.apply_async(helpSearch, ((board, colour, budget),)) for helper in self.helpers]
+
+        try:
+            move = searcher.search(board, colour, budget)
+        finally:
+            self.stop.value = 1
+            for result in running:
+                searcher.nodes += result.get()
+
+        return move
+
+    def close(self):
+        """ Stops the helpers and frees the shared memory """
+        for helper in self.helpers:
+            helper.terminate()
+        self.helpers = []
+        if self.memory is not None:
+            self.table = None
+            self.memory.close()
+            self.memory.unlink()
+            self.memory = None
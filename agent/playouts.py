@@ -0,0 +1,143 @@
+# COMP30024 Artificial Intelligence, Semester 1 2023
+# Project Part B: Game Playing Agent
+
+# Random playouts, many games at a time. B games are kept as a pair of (B, 49)
+# arrays laid out as in batch.py (owner +1 red, -1 blue, 0 empty, and power),
+# and each step plays one random move in every game that isn't over yet, with
+# the move choice and the spread done as whole-array operations. Moves are
+# chosen the way randomAgent plays: pick a random cell, spawn there if it is
+# empty and the board isn't full, and otherwise spread a random piece of ours
+# in a random direction.
+#
+# Games end as in the referee's Board.game_over (MAX_TURNS, or a colour with
+# no pieces after the first two turns) and are scored as in winner_color
+# (a win needs a lead of WIN_POWER_DIFF power).
+
+import numpy as np
+
+from .board import Board, CELLS, MAX_POWER, MAX_BOARD_POW, MAX_TURNS, WIN_POWER_DIFF
+from .batch import COLOUR_CODE, LANDED_ROWS, boardArrays
+
+DIRECTION_COUNT = LANDED_ROWS.shape[1]
+
+
+def randomCells(rng, allowed):
+    """
+    Returns a random allowed cell of each row of a (B, 49) boolean array, and
+    whether the row had one at all.
+    """
+    noise = rng.random(allowed.shape)
+    noise[~allowed] = -1
+    cells = noise.argmax(axis=1)
+    return (cells, allowed.any(axis=1))
+
+
+def results(owner, power):
+    """ Returns red's result (1 win, 0 loss, 0.5 draw) in each finished game """
+    balance = (owner * power.astype(np.int32)).sum(axis=1)
+    return np.where(balance >= WIN_POWER_DIFF, 1.0, np.where(balance <= -WIN_POWER_DIFF, 0.0, 0.5))
+
+
+def randomMoves(owner, power, toMove, rng):
+    """
+    Picks a random move in each of B games. Returns (B,) arrays of whether
+    it is a spawn, its cell (the source cell of a spread) and, for spreads,
+    its direction as an index into DIRECTIONS.
+    """
+    games = owner.shape[0]
+    rows = np.arange(games)
+    empty = owner == 0
+    canSpawn = power.sum(axis=1, dtype=np.int32) < MAX_BOARD_POW
+
+    # pick a cell, spawning there if we can, else spread a random piece
+    cells = rng.integers(0, CELLS, games)
+    spawn = empty[rows, cells] & canSpawn
+    (sources, hasPiece) = randomCells(rng, owner == toMove[:, None])
+
+    # with no piece to spread (the first turns), spawn on a random empty cell
+    (emptyCells, _) = randomCells(rng, empty)
+    stuck = ~spawn & ~hasPiece
+    spawn |= stuck
+
+    cells = np.where(spawn, np.where(stuck, emptyCells, cells), sources)
+    directions = rng.integers(0, DIRECTION_COUNT, games)
+    return (spawn, cells, directions)
+
+
+def applyMoves(owner, power, toMove, spawn, cells, directions):
+    """ Plays one move, as given by randomMoves, in each of B games in place """
+    rows = np.arange(owner.shape[0])
+
+    spawning = rows[spawn]
+    owner[spawning, cells[spawn]] = toMove[spawn]
+    power[spawning, cells[spawn]] = 1
+
+    # spreads, as in batch.childArrays
+    spreading = rows[~spawn]
+    if spreading.size:
+        source = cells[~spawn]
+        landed = LANDED_ROWS[source, directions[~spawn], power[spreading, source]]
+
+        spreadOwner = owner[spreading]
+        spreadPower = power[spreading]
+        survives = spreadPower < MAX_POWER
+        mover = toMove[spreading]
+        spreadPower = np.where(landed, (spreadPower + 1) * survives, spreadPower)
+        spreadOwner = np.where(landed, mover[:, None] * survives, spreadOwner)
+        spreadPower[np.arange(spreading.size), source] = 0
+        spreadOwner[np.arange(spreading.size), source] = 0
+
+        owner[spreading] = spreadOwner
+        power[spreading] = spreadPower
+
+
+def runPlayouts(owner, power, toMove, turns, rng=None):
+    """
+    Plays out B games from (B, 49) owner and power arrays, with (B,) arrays
+    of the colour code to move (+1 red, -1 blue) and the actions played so
+    far. Returns a (B,) array of red's results and the (B,) turns they
+    ended on.
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+
+    owner = owner.astype(np.int8)
+    power = power.astype(np.int8)
+    toMove = np.asarray(toMove, dtype=np.int8).copy()
+    turns = np.asarray(turns, dtype=np.int32).copy()
+
+    games = owner.shape[0]
+    outcomes = np.full(games, 0.5)
+    endTurns = turns.copy()
+
+    # games still going, as indexes into the results
+    live = np.arange(games)
+
+    while live.size:
+        # drop the games that are over, scoring them
+        over = (turns >= MAX_TURNS) | ((turns >= 2) & (~(owner > 0).any(axis=1) | ~(owner < 0).any(axis=1)))
+        if over.any():
+            outcomes[live[over]] = results(owner[over], power[over])
+            endTurns[live[over]] = turns[over]
+            keep = ~over
+            (live, owner, power, toMove, turns) = (live[keep], owner[keep], power[keep], toMove[keep], turns[keep])
+            if not live.size:
+                break
+
+        (spawn, cells, directions) = randomMoves(owner, power, toMove, rng)
+        applyMoves(owner, power, toMove, spawn, cells, directions)
+
+        toMove = -toMove
+        turns += 1
+
+    return (outcomes, endTurns)
+
+
+def playoutValue(board: Board, colourToMove, turnCount: int, games: int, rng=None):
+    """ Returns red's mean result over games random playouts from a board """
+    (owner, power) = boardArrays(board)
+    owners = np.broadcast_to(owner, (games, CELLS))
+    powers = np.broadcast_to(power, (games, CELLS))
+    toMove = np.full(games, COLOUR_CODE[colourToMove])
+    turns = np.full(games, turnCount)
+    return float(runPlayouts(owners, powers, toMove, turns, rng)[0].mean())
@@ -1,14 +1,21 @@
 # COMP30024 Artificial Intelligence, Semester 1 2023
 # Project Part B: Game Playing Agent
 
-import copy
-from dataclasses import dataclass
 from referee.game import \
     PlayerColor, Action, SpawnAction, SpreadAction, HexPos, HexDir
 from .utils import render_board
-from .coverage import getCoverages, peaceful, evaluateAtkDef
+from .board import Board, ENEMY, SIDE_TO_MOVE
+from .coverage import CoverageState, evaluateLeaf, EVALUATION_CACHE, cacheEntries
+from .transposition import TranspositionTable, EXACT, LOWER, UPPER
+from .timing import SearchClock, SearchTimeout, moveBudget, EXPECTED_GROWTH
+from .parallel import RootPool, SmpPool
+from .moves import generateMoves, captureMoves, isCapture, isLegal
+from .ordering import MoveOrdering
+from .book import OpeningBook, BOOK_PLIES
+from .threats import winningSpread, safeMoves
 #import random
 import math
+import time
 
 # This is the entry point for your game playing agent. the agent will do an
 # action given the state of the board through the calculations of minimax 
@@ -16,28 +23,97 @@ import math
 
 # intitialise the constants
 BREADTH = 6
-DEPTH = 4
-
-DIM = 7
-MAX_POWER = DIM - 1
-MAX_BOARD_POW = 49
-MAX_TURNS = 343
-
-DIRECTIONS = ((1,-1), (1,0), (0,1), (-1,1), (-1,0), (0,-1))
-ENEMY = {'r': 'b', 'b': 'r'}
+DEPTH = 3
+
+# how many captures deep the quiescence search follows an exchange past the
+# nominal depth, and how much better than its swing in power a capture may
+# turn out before it is no longer pruned as hopeless
+QUIESCENCE_DEPTH = 4
+DELTA_MARGIN = 6
+
+# score of a position where the side to move has a spread that wins on the
+# spot, one action short of the win itself
+IMMEDIATE_WIN = 999
+
+# half the width of the window iterations after the first are searched with,
+# around the score of the one before
+ASPIRATION_WINDOW = 3
+
+# how the iterations after the first are searched: 'pvs' with next_move in
+# an aspiration window, or 'mtdf' as a series of zero-window next_move calls
+# (see minimax.mtdf), which gives up and searches with the full window after
+# MTDF_PASSES of them. The parallel searches always use 'pvs'.
+# On the benchmark positions MTD(f) visits 10-18% more nodes than PVS at
+# depths 4 and 5, so PVS is the default
+DRIVER = 'pvs'
+MTDF_PASSES = 16
+
+# late move reductions: from the LMR_MOVES-th move of a node with at least
+# LMR_DEPTH actions left, quiet moves (not captures, the table's move or a
+# killer) are first searched LMR_REDUCTION actions shallower with a zero
+# window, and only searched to full depth if that beats the best so far.
+# LMR_REDUCTION = 0 turns them off
+LMR_MOVES = 3
+LMR_DEPTH = 3
+LMR_REDUCTION = 1
+
+# null-move pruning: with at least NULL_MOVE_DEPTH actions left, the side to
+# move first lets the enemy move twice, searched NULL_MOVE_REDUCTION actions
+# shallower. If it is still ahead of the window, the node is cut off without
+# searching its moves. It is skipped in positions like zugzwang, where
+# passing could be better than any move: peaceful ones (which are scored
+# without a search anyway), and when the side to move has fewer than
+# NULL_MOVE_PIECES pieces or is behind on power. NULL_MOVE_REDUCTION = 0
+# turns it off
+NULL_MOVE_DEPTH = 3
+NULL_MOVE_REDUCTION = 2
+NULL_MOVE_PIECES = 3
+
+# deepest iteration when the referee gives us a time limit to plan against
+MAX_DEPTH = 10
+
+# how many nodes are searched between checks of the clock
+TIME_CHECK_INTERVAL = 64
+
+# processes to search with, or 1 to search on this process alone, and how
+# the extra ones help: 'root' splits the root's children between them, 'smp'
+# has them search the whole tree alongside this process, sharing its table.
+# Neither has been shown to search faster than one process yet (see the top
+# of parallel.py), so the default is one; set e.g. availableCores() from
+# parallel.py to try them
+WORKERS = 1
+PARALLEL = 'root'
 
 ################################################################################
 ############################## Agent Class #####################################
 ################################################################################
 
 class Agent:
+    # the minimax's driver, see DRIVER
+    driver = DRIVER
+
     def __init__(self, color: PlayerColor, **referee: dict):
         """
         Initialise the agent.
         """  
         self.colour = None
         self.board = Board()
-        self.Minimax = minimax()
+        self.board.coverage = CoverageState(self.board)
+        self.Minimax = minimax(self.driver)
+        self.book = OpeningBook()
+        self.turns = 0
+
+        # the workers are started once here so that no move pays for it.
+        # The parallel searches only drive the iterations with PVS, so an
+        # MTD(f) agent always searches on this process alone
+        self.pool = None
+        self.smp = None
+        parallel = WORKERS > 1 and self.driver == 'pvs'
+        if parallel and PARALLEL == 'smp':
+            self.smp = SmpPool(minimax, WORKERS - 1)
+            self.Minimax.table = self.smp.table
+        elif parallel:
+            self.pool = RootPool(minimax, WORKERS)
         
         # select the match color:
         match color:
@@ -52,9 +128,26 @@ class Agent:
         """
         Return the next action to take.
         """
+        budget = moveBudget(referee.get("time_remaining"), self.turns)
+
+        # the evaluation cache gets a share of whatever memory we have left
+        EVALUATION_CACHE.resize(cacheEntries(referee.get("space_remaining"), referee.get("space_limit")))
+
+        # a spread that wins on the spot is always played
+        next_move = winningSpread(self.board, self.colour)
+
+        # the first moves come straight from the opening book when it has them
+        if next_move is None and self.turns < BOOK_PLIES:
+            next_move = self.book.lookup(self.board, self.colour)
+
         ######## calling minimax algorithm for next move ########
-        # if its not at an end game situation find best move VIA minimax
-        next_move = self.Minimax.next_move(self.board, self.colour)
+        # if its not at an end game situation find best move VIA minimax,
+        # deepening for as long as this move's share of our time allows
+        if next_move is None:
+            if self.smp is not None:
+                next_move = self.smp.search(self.Minimax, self.board, self.colour, budget)
+            else:
+                next_move = self.Minimax.search(self.board, self.colour, budget, self.pool)
 
         # return the action    
         if (next_move[0] == 'spread'):
@@ -68,6 +161,7 @@ class Agent:
         Update the agent with the last player's action.
         Note: this updates your agent as well.
         """
+        self.turns += 1
 
         match action:
             case SpawnAction(cell):
@@ -75,266 +169,41 @@ class Agent:
                 if (color == PlayerColor.BLUE):
                     c = 'b'
                 self.board.spawn((cell.r, cell.q), c)
-                return
+                move = ('spawn', (cell.r, cell.q), c)
             case SpreadAction(cell, direction):
                 self.board.spread((cell.r, cell.q), (direction.value.r, direction.value.q))
-                return
+                move = ('spread', (cell.r, cell.q), (direction.value.r, direction.value.q))
 
-################################################################################
-########################### Ineternal Board Class ##############################
-################################################################################
+        # the next search starts from what this one learned about the game
+        self.Minimax.advance(move)
 
-@dataclass
-class Board:
+class MTDFAgent(Agent):
     """
-    A data structure to represent the internal state of the board.
+    The same agent searching with MTD(f), on one process whatever WORKERS
+    is. Play it from the referee as agent:MTDFAgent.
     """
-    
-    def __init__(self):
-        # Initialise the internal board.
-        self.board: dict[tuple, tuple] = {}
-
-    def spawn(self, position: tuple, color):
-        """ Spawns a piece (its position) on the board """
-        self.board[position] = (color, 1)
-    
-    def countPieces(self, color: str):
-        """ Counts the number of pieces on the board for a given color """
-        count = 0
-        for piece in self.board.keys():
-            if self.board.get(piece)[0] == color:
-                count += 1
-        return count
-
-    def spread(self, piece: tuple, direction: tuple):
-        """ Spreads a piece (its position) in a direction on the board """
-        colour = self.board.get(piece)[0]
-        spreadDistance = self.board.get(piece)[1]
-
-        temp = piece 
-
-        # go through all the spread distance
-        while spreadDistance:
-            newPosition = self.findNewPosition(temp, direction)
-            self.spreadToNode(newPosition, colour)
-
-            # set temp to new position to use again next iteration
-            temp = newPosition
-
-            spreadDistance -= 1
-
-        # delete original piece from board
-        del self.board[piece]
-            
-
-    def findNewPosition(self, position, direction):
-        """ Finds the destination of a node after a move in a direction """
-
-        newR = position[0] + direction[0]
-        newQ = position[1] + direction[1]
-
-        # require both r and q to be positive, and also less than the dimension
-        if newR < 0:
-            newR = DIM - 1
-        elif newR >= DIM:
-            newR = 0
-
-        if newQ < 0:
-            newQ = DIM - 1
-        elif newQ >= DIM:
-            newQ = 0
-
-        return (newR, newQ)
-
-    def spreadToNode(self, newPosition, colour):
-            """ 
-            Increments power of a node and changes its colour if it is an enemy node, 
-            or removing the node if the max power is reached 
-            """
-            if newPosition not in self.board.keys():
-                self.board[newPosition] = (colour, 1)    
-            else:
-                power = self.board.get(newPosition)[1]
-                if power == MAX_POWER:
-                    self.board.pop(newPosition)
-                else:
-                    self.board[newPosition] = (colour, 1 + power)
-            return
-    
-    def getValues(self):
-        return self.board.values()
-    
-    def getKeys(self):
-        return self.board.keys()
-
+    driver = 'mtdf'
 
 ################################################################################
 ######################## Minimax helper functions ##############################
 ################################################################################   
     
-def get_root_successors(state: Board, colourToMove):
-    """ gets the successors, possible states we need to explore """
-    successors = []
-
-    # do we need to copy board into state? just use the board argument
-    temp = copy.deepcopy(state)
-    
-   
-    # initialise the coverages
-    coverages = getCoverages(state.board)
-    colourToMoveCoverage = None
-    colourJustPlayedCoverage = None
-
-    # set the coverages
-    if colourToMove == 'r':
-        colourToMoveCoverage = coverages[0]
-        colourJustPlayedCoverage = coverages[1]
-    else:
-        colourToMoveCoverage = coverages[1]
-        colourJustPlayedCoverage = coverages[0]
-    
-    # loop through the board and find all player's piece
-    # when you land on a piece perform a spread in 6 directions
-    # if it is empty spawn a piece
-    # add to the successors list
-    for position in state.board.keys():
-        if(state.board.get(position)[0] == colourToMove):
-            for direction in DIRECTIONS:
-                temp.spread(position, direction)
-                successors.append((temp, ('spread', position, direction)))
-                temp = copy.deepcopy(state) # reset temp to original state
-    
-    # for spawn action
-    if getTotalPower(state.board) < MAX_BOARD_POW:
-        for r in range(DIM):
-            for q in range(DIM):
-                if (r,q) not in state.board.keys():
-                    playerCoverage = colourToMoveCoverage[r,q]
-                    if playerCoverage >= colourJustPlayedCoverage[(r,q)]:
-                        temp.spawn((r, q), colourToMove)
-                        # add the spawn to the successors
-                        successors.append((temp, ('spawn', (r, q), colourToMove)))
-                        temp = copy.deepcopy(state)
-
-    bestForPower = None
-
-    # person just moved is r --> next to move is b, vice versa
-    if colourToMove == 'r':
-        successors = sorted(successors, key = lambda x: evaluateAtkDef(x[0].board, 'b'), reverse=True)
-        bestForPower = max(successors, key = lambda x: evaluatePower(x[0].board))
-    else:
-        successors = sorted(successors, key = lambda x: evaluateAtkDef(x[0].board, 'r'))
-        bestForPower = min(successors, key = lambda x: evaluatePower(x[0].board))
-    
-    # choose the top 'b' successors
-    b = min(len(successors), BREADTH)
-    chosenSuccessors = successors[0:(b-1)]
-
-    # add the board with best power as a greedy component to the list of successors to explore
-    if bestForPower in chosenSuccessors:
-        chosenSuccessors.remove(bestForPower)
-    else:
-        chosenSuccessors.pop()
-
-    chosenSuccessors.insert(0, bestForPower)
-    
-    # return chosen list of successors
-    return chosenSuccessors
-
-def get_successors(state: Board, colourToMove):
-    """ gets the successors, possible states we need to explore """
-    successors = []
-
-    temp = copy.deepcopy(state)
-    
-    # loop through the board and find all player's piece
-    # when you land on a piece perform a spread in 6 directions
-    # if it is empty spawn a piece
-    # add to the successors list
-    
-    coverages = getCoverages(state.board)
-    colourToMoveCoverage = None
-    colourJustPlayedCoverage = None
-
-    if colourToMove == 'r':
-        colourToMoveCoverage = coverages[0]
-        colourJustPlayedCoverage = coverages[1]
-    else:
-        colourToMoveCoverage = coverages[1]
-        colourJustPlayedCoverage = coverages[0]
-    
-    for position in state.board.keys():
-        if(state.board.get(position)[0] == colourToMove):
-            for direction in DIRECTIONS:
-                temp.spread(position, direction)
-                successors.append(temp)
-                temp = copy.deepcopy(state) # reset temp to original state
-    
-    if getTotalPower(state.board) < MAX_BOARD_POW:
-        for r in range(DIM):
-            for q in range(DIM):
-                if (r,q) not in state.board.keys():
-                    playerCoverage = colourToMoveCoverage[r,q]
-                    if playerCoverage >= colourJustPlayedCoverage[(r,q)]:
-                        temp.spawn((r, q), colourToMove)
-                        successors.append(temp)
-                        temp = copy.deepcopy(state)
-
-    bestForPower = None
-    # person just moved is r --> next to move is b, vice versa
-    if colourToMove == 'r':
-        successors = sorted(successors, key = lambda x: evaluateAtkDef(x.board, 'b'), reverse=True)
-        bestForPower = max(successors, key = lambda x: evaluatePower(x.board))
-    else:
-        successors = sorted(successors, key = lambda x: evaluateAtkDef(x.board, 'r'))
-        bestForPower = min(successors, key = lambda x: evaluatePower(x.board))
-    
-    # choose the top 'b' successors
-    b = min(len(successors), BREADTH)
-    chosenSuccessors = successors[0:(b-1)]
-
-    # add the board with best power as a greedy component to the list of successors to explore
-    if bestForPower in chosenSuccessors:
-        chosenSuccessors.remove(bestForPower)
-    else:
-        chosenSuccessors.pop()
-
-    chosenSuccessors.insert(0, bestForPower)
-      
-    return chosenSuccessors
-
-
-
 # higher power favours red, lower power favours blue
-def evaluatePower(board: dict[tuple, tuple]):
+def evaluatePower(board: Board):
     """"""
 
-    totalPower = 0
-    for v in board.values():
-        if v[0] == 'r':
-            totalPower += v[1]
-        else:
-            totalPower -= v[1]
-    return totalPower
+    return board.powerBalance()
 
 
-def getTotalPower(board):
+def getTotalPower(board: Board):
     """
     Returns the sum of powers on the board
     """
 
-    power = 0
-    for (_, k) in board.values():
-        power += k
-    return power
+    return board.totalPower()
 
-def countColour(board, colour):
-    total = 0
-    for (_, (c, _)) in board.items():
-        if c == colour:
-            total += 1
-
-    return total
+def countColour(board: Board, colour):
+    return board.countPieces(colour)
 
 
 ################################################################################
@@ -343,8 +212,32 @@ def countColour(board, colour):
 
 class minimax:
     
-    def __init__(self):
-        return
+    def __init__(self, driver=DRIVER):
+        # results of earlier searches, kept between moves
+        self.table = TranspositionTable()
+
+        # how iterations are searched, 'pvs' or 'mtdf'
+        self.driver = driver
+
+        # budget of the current search and the nodes it has visited
+        self.clock = SearchClock()
+        self.nodes = 0
+
+        # 0 for the main search, or which Lazy SMP helper this is
+        self.helper = 0
+
+        # score of the last root search, which the next iteration's
+        # aspiration window is centred on
+        self.rootScore = 0
+
+        # killer moves and history for generateMoves
+        self.ordering = MoveOrdering()
+
+        # whether the search is below a null move, where no other is tried
+        self.passed = False
+
+        # the best line of the last search, less the actions played since
+        self.pv = []
         
     # minimax implementation
 
@@ -352,89 +245,515 @@ class minimax:
     # alpha: MAX score along the path to state
     # beta: MIN score along the path to state  
     # depth: the depth of the search
+    # ply: how many actions state is from the root, whatever the depth left
     
-    def max_value(self, state: Board, alpha, beta, colour, depth):
-        board = state.board
+    def max_value(self, state: Board, alpha, beta, colour, depth, ply):
+        self.tick()
+        board = state
         
         new_colour = ENEMY[colour]
        
-        if countColour(board,'r') == 0:
+        # whether the game is over, the position is peaceful, and its
+        # balance of power, all in one call
+        (lost, calm, balance, _, _) = evaluateLeaf(board, colour, scored=False)
+        if lost == 'r':
             return -1000
-        elif countColour(board,'b') == 0:
+        elif lost == 'b':
             return 1000
 
-        if peaceful(board):
-            return evaluatePower(board)
+        # a spread that wipes out the enemy ends the game here
+        if winningSpread(board, colour) is not None:
+            return IMMEDIATE_WIN
+
+        if calm:
+            return balance
 
         if depth == 0:
-            return evaluateAtkDef(board, colour)[0]
+            return self.quiescence(board, alpha, beta, colour, QUIESCENCE_DEPTH)
+
+        # use what an earlier search found about this position
+        key = self.positionKey(board, colour)
+        window = (alpha, beta)
+        (tableMove, alpha, beta, score) = self.probe(key, alpha, beta, depth)
+        if score is not None:
+            return score
+
+        # if passing still beats beta, so will one of our moves
+        if self.nullMoveAllowed(board, colour, depth, balance >= beta):
+            score = self.nullMove(board, beta - 1, beta, colour, depth, ply)
+            if score >= beta:
+                return beta
         
         v = -math.inf
+        best = None
            
-        for s in get_successors(state, colour):
-            v = max(v, self.min_value(s, alpha, beta, new_colour, depth - 1))
+        killers = self.ordering.killerMoves(ply)
+        for (number, move) in enumerate(generateMoves(state, colour, tableMove, BREADTH, self.ordering, ply)):
+            reduced = self.reducible(state, colour, move, number, depth, tableMove, killers)
+            token = state.apply(move)
+            if best is None:
+                score = self.min_value(state, alpha, beta, new_colour, depth - 1, ply + 1)
+            else:
+                # the moves after the first are expected to be worse, which a
+                # zero window checks cheaply (and for late quiet moves at
+                # reduced depth), and one that turns out better is searched
+                # again with the full window
+                score = alpha + 1
+                if reduced:
+                    score = self.min_value(state, alpha, alpha + 1, new_colour, max(0, depth - 1 - LMR_REDUCTION), ply + 1)
+                if score > alpha:
+                    score = self.min_value(state, alpha, alpha + 1, new_colour, depth - 1, ply + 1)
+                if alpha < score < beta:
+                    score = self.min_value(state, alpha, beta, new_colour, depth - 1, ply + 1)
+            state.undo(token)
+
+            if score > v:
+                v = score
+                best = move
 
             alpha = max(alpha, v)
             if alpha >= beta:
+                self.ordering.cutoff(colour, best, depth, ply)
+                self.table.store(key, depth, LOWER, beta, best)
                 return beta
             
+        self.store(key, depth, window, v, best)
         return v
     
-    def min_value(self, state: Board, alpha, beta, colour, depth):
-        board = state.board
+    def min_value(self, state: Board, alpha, beta, colour, depth, ply):
+        self.tick()
+        board = state
         new_colour = ENEMY[colour]
         
-        if countColour(board, 'r') == 0:
+        (lost, calm, balance, _, _) = evaluateLeaf(board, colour, scored=False)
+        if lost == 'r':
             return -1000
-        elif countColour(board, 'b') == 0:
+        elif lost == 'b':
             return 1000
 
-        if peaceful(board): 
-            return evaluatePower(board)
+        if winningSpread(board, colour) is not None:
+            return -IMMEDIATE_WIN
+
+        if calm:
+            return balance
 
         if depth == 0:
-            return evaluateAtkDef(board, colour)[0] 
+            return self.quiescence(board, alpha, beta, colour, QUIESCENCE_DEPTH)
+
+        # use what an earlier search found about this position
+        key = self.positionKey(board, colour)
+        window = (alpha, beta)
+        (tableMove, alpha, beta, score) = self.probe(key, alpha, beta, depth)
+        if score is not None:
+            return score
+
+        if self.nullMoveAllowed(board, colour, depth, balance <= alpha):
+            score = self.nullMove(board, alpha, alpha + 1, colour, depth, ply)
+            if score <= alpha:
+                return score
         
         v = math.inf
+        best = None
                 
-        for s in get_successors(state, colour):
-            v = min(v, self.max_value(s, alpha, beta, new_colour, depth - 1))
+        killers = self.ordering.killerMoves(ply)
+        for (number, move) in enumerate(generateMoves(state, colour, tableMove, BREADTH, self.ordering, ply)):
+            reduced = self.reducible(state, colour, move, number, depth, tableMove, killers)
+            token = state.apply(move)
+            if best is None:
+                score = self.max_value(state, alpha, beta, new_colour, depth - 1, ply + 1)
+            else:
+                score = beta - 1
+                if reduced:
+                    score = self.max_value(state, beta - 1, beta, new_colour, max(0, depth - 1 - LMR_REDUCTION), ply + 1)
+                if score < beta:
+                    score = self.max_value(state, beta - 1, beta, new_colour, depth - 1, ply + 1)
+                if alpha < score < beta:
+                    score = self.max_value(state, alpha, beta, new_colour, depth - 1, ply + 1)
+            state.undo(token)
+
+            if score < v:
+                v = score
+                best = move
 
             if v <= alpha:
+                self.ordering.cutoff(colour, best, depth, ply)
+                self.table.store(key, depth, UPPER, v, best)
                 return v
             beta = min(beta, v)
 
+        self.store(key, depth, window, v, best)
         return v
+
+    def quiescence(self, state: Board, alpha, beta, colour, depth):
+        """
+        Searches only captures from a leaf until the position is peaceful, so
+        that leaves are not scored in the middle of an exchange. The colour to
+        move may stand pat on the static evaluation rather than capture, and
+        captures whose swing in power can't bring the score into the window
+        are skipped (delta pruning).
+        """
+        self.tick()
+        board = state
+        new_colour = ENEMY[colour]
+
+        (lost, calm, balance, standPat, _) = evaluateLeaf(board, colour)
+        if lost == 'r':
+            return -1000
+        elif lost == 'b':
+            return 1000
+
+        if calm:
+            return balance
+
+        # peaceful positions have no captures, let alone winning ones
+        if winningSpread(board, colour) is not None:
+            return IMMEDIATE_WIN if colour == 'r' else -IMMEDIATE_WIN
+
+        if depth == 0:
+            return standPat
+
+        if colour == 'r':
+            if standPat >= beta:
+                return standPat
+            alpha = max(alpha, standPat)
+            v = standPat
+
+            for (gain, move) in captureMoves(board, colour):
+                # captures come largest gain first, so none of the rest can help
+                if standPat + gain + DELTA_MARGIN <= alpha:
+                    break
+
+                token = board.apply(move)
+                score = self.quiescence(board, alpha, beta, new_colour, depth - 1)
+                board.undo(token)
+
+                v = max(v, score)
+                alpha = max(alpha, v)
+                if alpha >= beta:
+                    return v
+
+        else:
+            if standPat <= alpha:
+                return standPat
+            beta = min(beta, standPat)
+            v = standPat
+
+            for (gain, move) in captureMoves(board, colour):
+                if standPat - gain - DELTA_MARGIN >= beta:
+                    break
+
+                token = board.apply(move)
+                score = self.quiescence(board, alpha, beta, new_colour, depth - 1)
+                board.undo(token)
+
+                v = min(v, score)
+                beta = min(beta, v)
+                if v <= alpha:
+                    return v
+
+        return v
+
+    def positionKey(self, board: Board, colour):
+        """
+        Returns the table key of a position with colour to move
+        """
+        return board.key ^ SIDE_TO_MOVE[colour]
+
+    def probe(self, key, alpha, beta, depth):
+        """
+        Looks a position up in the transposition table. Returns the stored best
+        move, the window narrowed by any stored bound, and a score if the
+        stored result is enough to cut the search off here.
+        """
+        entry = self.table.probe(key)
+        if entry is None:
+            return (None, alpha, beta, None)
+
+        (_, entryDepth, bound, score, tableMove, _) = entry
+        if entryDepth >= depth:
+            if bound == EXACT:
+                return (tableMove, alpha, beta, score)
+            if bound == LOWER:
+                alpha = max(alpha, score)
+            else:
+                beta = min(beta, score)
+            if alpha >= beta:
+                return (tableMove, alpha, beta, score)
+
+        return (tableMove, alpha, beta, None)
+
+    def reducible(self, board: Board, colour, move, number: int, depth, tableMove, killers: list):
+        """ Checks whether the number-th move of a node is a late quiet move, searched shallower first """
+        return (
+            LMR_REDUCTION > 0 and number >= LMR_MOVES and depth >= LMR_DEPTH
+            and move != tableMove and move not in killers
+            and not isCapture(board, colour, move)
+        )
+
+    def nullMoveAllowed(self, board: Board, colour, depth, ahead: bool):
+        """
+        Checks whether to try a null move at a node that isn't peaceful,
+        given whether the side to move is ahead of the window on power
+        """
+        return (
+            NULL_MOVE_REDUCTION > 0 and depth >= NULL_MOVE_DEPTH and ahead
+            and not self.passed and board.countPieces(colour) >= NULL_MOVE_PIECES
+        )
+
+    def nullMove(self, board: Board, alpha, beta, colour, depth, ply):
+        """ Searches the position with the enemy to move instead of colour, NULL_MOVE_REDUCTION shallower """
+        self.passed = True
+        try:
+            if colour == 'r':
+                return self.min_value(board, alpha, beta, ENEMY[colour], max(0, depth - 1 - NULL_MOVE_REDUCTION), ply + 1)
+            return self.max_value(board, alpha, beta, ENEMY[colour], max(0, depth - 1 - NULL_MOVE_REDUCTION), ply + 1)
+        finally:
+            self.passed = False
+
+    def store(self, key, depth, window, v, move):
+        """ Stores a score in the table with its bound type for the window it was searched with """
+        (alpha, beta) = window
+        if v <= alpha:
+            bound = UPPER
+        elif v >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        self.table.store(key, depth, bound, v, move)
+    
+    def tick(self):
+        """ Counts a node, aborting the search if the move's budget has run out """
+        self.nodes += 1
+        if self.nodes % TIME_CHECK_INTERVAL == 0 and self.clock.expired():
+            raise SearchTimeout()
+
+    def search(self, board: Board, colour, budget=None, pool=None, stop=None):
+        """
+        Iterative deepening around next_move. Searches one ply deeper at a time
+        while the budget (CPU seconds, or None for no limit) allows, and returns
+        the best move of the deepest search that finished. With a RootPool the
+        iterations after the first are searched by its workers, and the budget
+        is wall clock time since this process mostly waits on them. A shared
+        stop flag ends the search early, as for Lazy SMP helpers.
+        """
+        self.table.newSearch()
+        self.ordering.newSearch()
+        self.seedPrincipalVariation(board, colour)
+        self.nodes = 0
+        timer = time.process_time if pool is None else time.perf_counter
+        clock = SearchClock(budget, timer, stop)
+        maxDepth = DEPTH if budget is None else MAX_DEPTH
+
+        # the first iteration always finishes so there is a move to play
+        self.clock = SearchClock()
+        best = self.next_move(board, colour, 1)
+        lastTime = clock.elapsed()
+        self.clock = clock
+        completed = 1
+
+        # odd Lazy SMP helpers start a ply deeper than the others
+        for depth in range(2 + self.helper % 2, maxDepth + 1):
+            # don't start an iteration that can't finish in time
+            if not clock.allows(lastTime * EXPECTED_GROWTH):
+                break
+
+            started = clock.elapsed()
+            snapshot = board.snapshot()
+            try:
+                if pool is None and self.driver == 'mtdf':
+                    best = self.mtdf(board, colour, depth, self.rootScore)
+                elif pool is None:
+                    best = self.aspirate(board, colour, depth, self.rootScore)
+                else:
+                    best = self.parallel_next_move(board, colour, depth, pool)
+            except SearchTimeout:
+                # the aborted search left moves applied, so restore the board
+                board.undo(snapshot)
+                break
+            lastTime = clock.elapsed() - started
+            completed = depth
+
+        self.pv = self.principalVariation(board, colour, completed)
+        return best
+
+    def principalVariation(self, board: Board, colour, length):
+        """ Returns the line of best moves the table holds from a position, at most length actions long """
+        line = []
+        tokens = []
+        while len(line) < length:
+            key = self.positionKey(board, colour)
+            move = self.table.bestMove(key)
+            if move is None or not isLegal(board, colour, move):
+                break
+            line.append(move)
+            tokens.append(board.apply(move))
+            colour = ENEMY[colour]
+
+        for token in reversed(tokens):
+            board.undo(token)
+        return line
+
+    def advance(self, move):
+        """
+        Follows an action played in the game: the principal variation moves
+        on if it predicted the action, and is dropped otherwise
+        """
+        if self.pv and self.pv[0] == move:
+            self.pv = self.pv[1:]
+        else:
+            self.pv = []
+
+    def seedPrincipalVariation(self, board: Board, colour):
+        """
+        Puts the rest of the last search's principal variation back in the
+        table where newer entries have replaced it, as a best move with no
+        score, so that the search tries it first
+        """
+        tokens = []
+        for move in self.pv:
+            if not isLegal(board, colour, move):
+                break
+            key = self.positionKey(board, colour)
+            if self.table.bestMove(key) is None:
+                self.table.store(key, 0, LOWER, -math.inf, move)
+            tokens.append(board.apply(move))
+            colour = ENEMY[colour]
+
+        for token in reversed(tokens):
+            board.undo(token)
     
     # colour should affect this algorithm
-    def next_move(self, board: Board, colour):
+    def next_move(self, board: Board, colour, depth=DEPTH, alpha=-math.inf, beta=math.inf):
+        """
+        Searches every root move to depth within the window (alpha, beta)
+        and returns the best, leaving its score in rootScore. The first move
+        gets the full window and the rest zero windows, as in max_value.
+        """
         best_score = None
-        alpha = -math.inf
-        beta = math.inf
+        window = (alpha, beta)
         next_move = None
 
+        key = self.positionKey(board, colour)
+        tableMove = self.table.bestMove(key)
+        successors = safeMoves(board, colour, list(generateMoves(board, colour, tableMove, BREADTH, self.ordering)))
+
+        # Lazy SMP helpers each take the root moves in a different order
+        if self.helper:
+            shift = self.helper % len(successors)
+            successors = successors[shift:] + successors[:shift]
+
         if colour == 'r':
             best_score = -math.inf
-            for s in get_root_successors(board, colour):
-                
-                score = self.min_value(s[0], alpha, beta, ENEMY[colour], DEPTH - 1)
+            for move in successors:
+                if next_move is None:
+                    score = self.score_move(board, colour, move, depth, alpha, beta)
+                else:
+                    score = self.score_move(board, colour, move, depth, alpha, alpha + 1)
+                    if alpha < score < beta:
+                        score = self.score_move(board, colour, move, depth, alpha, beta)
                 
                 if score > best_score:
                     best_score = score
-                    next_move = s
+                    next_move = move
                 alpha = max(alpha, best_score)
+                if alpha >= beta:
+                    break
         
         else:
             best_score = math.inf
-            for s in get_root_successors(board, colour):
-                score = self.max_value(s[0], alpha, beta, ENEMY[colour], DEPTH - 1)
+            for move in successors:
+                if next_move is None:
+                    score = self.score_move(board, colour, move, depth, alpha, beta)
+                else:
+                    score = self.score_move(board, colour, move, depth, beta - 1, beta)
+                    if alpha < score < beta:
+                        score = self.score_move(board, colour, move, depth, alpha, beta)
 
                 if score < best_score:
                     best_score = score
-                    next_move = s
+                    next_move = move
                 beta = min(beta, best_score)
+                if alpha >= beta:
+                    break
+
+        self.store(key, depth, window, best_score, next_move)
+        self.rootScore = best_score
         
-        return next_move[1]
+        return next_move
+
+    def aspirate(self, board: Board, colour, depth, guess):
+        """
+        next_move in a window of ASPIRATION_WINDOW either side of guess, the
+        score of the previous iteration. Scores usually change little from
+        one iteration to the next, and the narrow window cuts off more. If
+        the score falls outside it, the search is repeated with the full
+        window.
+        """
+        if abs(guess) >= IMMEDIATE_WIN - MAX_DEPTH:
+            return self.next_move(board, colour, depth)
+
+        (alpha, beta) = (guess - ASPIRATION_WINDOW, guess + ASPIRATION_WINDOW)
+        move = self.next_move(board, colour, depth, alpha, beta)
+        if alpha < self.rootScore < beta:
+            return move
+        return self.next_move(board, colour, depth)
+
+    def mtdf(self, board: Board, colour, depth, guess):
+        """
+        MTD(f): converges on the root's score with zero-window searches,
+        starting from guess, the score of the previous iteration. Each search
+        either fails high, raising the lower bound on the score, or fails low,
+        lowering the upper bound, and the transposition table keeps what the
+        earlier ones found, so the later ones are cheap. The move is from the
+        last search that went the root mover's way, which found a move at
+        least as good as the score.
+        """
+        (lower, upper) = (-math.inf, math.inf)
+        score = guess
+        best = None
+
+        for _ in range(MTDF_PASSES):
+            if lower >= upper:
+                return best
+            beta = score + 1 if score == lower else score
+            move = self.next_move(board, colour, depth, beta - 1, beta)
+            score = self.rootScore
+
+            if score < beta:
+                upper = score
+            else:
+                lower = score
+            if (score >= beta) == (colour == 'r'):
+                best = move
+
+        # scores far from the guess take too many passes to reach
+        return self.next_move(board, colour, depth)
+
+    def parallel_next_move(self, board: Board, colour, depth, pool: RootPool):
+        """ next_move with the root's children searched by the pool's workers """
+        key = self.positionKey(board, colour)
+        tableMove = self.table.bestMove(key)
+        successors = safeMoves(board, colour, list(generateMoves(board, colour, tableMove, BREADTH, self.ordering)))
+
+        (next_move, best_score, nodes) = pool.searchRoot(
+            board, colour, successors, depth, self.clock
+        )
+        self.nodes += nodes
+
+        self.table.store(key, depth, EXACT, best_score, next_move)
+        self.rootScore = best_score
+
+        return next_move
+
+    def score_move(self, board: Board, colour, move, depth, alpha, beta):
+        """ Searches the child a root move leads to, to a total depth of depth """
+        token = board.apply(move)
+        if colour == 'r':
+            score = self.min_value(board, alpha, beta, ENEMY[colour], depth - 1, 1)
+        else:
+            score = self.max_value(board, alpha, beta, ENEMY[colour], depth - 1, 1)
+        board.undo(token)
+        return score
 
 ################################################################################
 ############################### End Program ####################################
@@ -0,0 +1,145 @@
+# COMP30024 Artificial Intelligence, Semester 1 2023
+# Project Part B: Game Playing Agent
+
+# Symmetries of the board. The 7x7 board wraps around in both axes, so it is
+# a torus: any position shifted by a (r, q) translation plays exactly like the
+# original. The six hex rotations and six reflections that keep the spread
+# directions as a set do too, giving 12 * 49 = 588 equivalent frames for every
+# position. The canonical form of a position is the frame whose Zobrist key
+# is smallest, and keying the opening book on it lets positions seen in any
+# frame share one entry.
+#
+# The key of a position in every frame is built as a NumPy vector, one XOR
+# per piece, so finding the canonical key is a single argmin. Moves stored
+# under a canonical key are kept in the canonical frame and mapped back into
+# the real frame when they are read.
+#
+# The search keys its transposition table on the board's own key instead.
+# Keeping the 588 keys up to date through every make and unmake cost more
+# than the extra table hits from symmetric transpositions gave back.
+
+import numpy as np
+
+from .board import Board, DIM, CELLS, MAX_POWER, DIRECTIONS, DIRECTION_INDEX, \
+    ZOBRIST, cellIndex, cellPosition
+
+# (r, q) -> (a * r + b * q, c * r + d * q) for a hex rotation by 60 degrees and
+# a reflection, both of which map the six directions onto each other
+ROTATION = (1, 1, -1, 0)
+REFLECTION = (0, 1, 1, 0)
+
+
+def compose(first: tuple, second: tuple):
+    """ Returns the linear map that applies first and then second """
+    (a, b, c, d) = first
+    (e, f, g, h) = second
+    return (e * a + f * c, e * b + f * d, g * a + h * c, g * b + h * d)
+
+
+def generateLinearMaps():
+    """ Generates the 12 rotations and reflections, identity first """
+    maps = []
+    rotation = (1, 0, 0, 1)
+    for _ in range(6):
+        maps.append(rotation)
+        rotation = compose(rotation, ROTATION)
+    for k in range(6):
+        maps.append(compose(REFLECTION, maps[k]))
+    return tuple(maps)
+
+
+LINEAR_MAPS = generateLinearMaps()
+
+# every transform is a linear map followed by a translation, numbered
+# map * CELLS + translation, so transform 0 is the identity
+TRANSFORMS = len(LINEAR_MAPS) * CELLS
+
+
+def generateTransformTables():
+    """
+    Generates, for every transform, the cell each cell is mapped to and the
+    direction each direction is mapped to (as indexes into DIRECTIONS), and
+    the transform that undoes it.
+    """
+    cellMaps = []
+    directionMaps = []
+
+    for (a, b, c, d) in LINEAR_MAPS:
+        directionMap = tuple(
+            DIRECTION_INDEX[(a * dr + b * dq, c * dr + d * dq)] for (dr, dq) in DIRECTIONS
+        )
+        for translation in range(CELLS):
+            (tr, tq) = cellPosition(translation)
+            cellMap = []
+            for index in range(CELLS):
+                (r, q) = cellPosition(index)
+                cellMap.append(cellIndex(((a * r + b * q + tr) % DIM, (c * r + d * q + tq) % DIM)))
+            cellMaps.append(tuple(cellMap))
+            directionMaps.append(directionMap)
+
+    # the inverse of a transform is the one whose cell map undoes it
+    byCellMap = {cellMap: transform for (transform, cellMap) in enumerate(cellMaps)}
+    inverses = []
+    for cellMap in cellMaps:
+        inverse = [0] * CELLS
+        for (index, mappedIndex) in enumerate(cellMap):
+            inverse[mappedIndex] = index
+        inverses.append(byCellMap[tuple(inverse)])
+
+    return (tuple(cellMaps), tuple(directionMaps), tuple(inverses))
+
+
+(CELL_MAPS, DIRECTION_MAPS, INVERSES) = generateTransformTables()
+
+
+def generateSymmetryKeys():
+    """
+    Generates SYMMETRY_KEYS[colour][power][index], a vector holding for every
+    transform the Zobrist key of a piece on the cell that index is mapped to.
+    """
+    cellMaps = np.array(CELL_MAPS)
+    symmetryKeys = {}
+    for colour in ('r', 'b'):
+        byPower = [None]
+        for power in range(1, MAX_POWER + 1):
+            keys = np.array(ZOBRIST[colour][power], dtype=np.uint64)
+            byPower.append(tuple(keys[cellMaps[:, index]] for index in range(CELLS)))
+        symmetryKeys[colour] = tuple(byPower)
+    return symmetryKeys
+
+
+SYMMETRY_KEYS = generateSymmetryKeys()
+
+
+def canonicalKey(board: Board):
+    """
+    Returns the key of the canonical form of a board, and the transform that
+    maps the board onto it
+    """
+    keys = np.zeros(TRANSFORMS, dtype=np.uint64)
+    for (index, colour, power) in board.pieces():
+        keys ^= SYMMETRY_KEYS[colour][power][index]
+    transform = int(keys.argmin())
+    return (int(keys[transform]), transform)
+
+
+def transformMove(move: tuple, transform: int):
+    """ Maps a ('spread', position, direction) or ('spawn', position, colour) move through a transform """
+    position = cellPosition(CELL_MAPS[transform][cellIndex(move[1])])
+    if move[0] == 'spread':
+        return ('spread', position, DIRECTIONS[DIRECTION_MAPS[transform][DIRECTION_INDEX[move[2]]]])
+    return ('spawn', position, move[2])
+
+
+def toCanonical(move, transform: int):
+    """ Maps a move in the real frame into the canonical frame given by canonicalKey """
+    if move is None:
+        return None
+    return transformMove(move, transform)
+
+
+def fromCanonical(move, transform: int):
+    """ Maps a move in the canonical frame given by canonicalKey back into the real frame """
+    if move is None:
+        return None
+    return transformMove(move, INVERSES[transform])
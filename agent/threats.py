@@ -0,0 +1,107 @@
+# COMP30024 Artificial Intelligence, Semester 1 2023
+# Project Part B: Game Playing Agent
+
+# Immediate wins and losses, found with masks rather than by playing moves.
+# A spread wins on the spot when the cells it lands on cover every enemy
+# piece: each is captured or, at MAX_POWER, removed, and the game ends with
+# the enemy gone. SPREAD_MASKS (see board.py) already holds the cells hit by
+# every (cell, direction, power), so checking a spread is one AND, and a
+# piece whose spreads in all six directions together (SPREAD_REACH) miss an
+# enemy piece is skipped without looking at its directions. Since a spread
+# hits at most MAX_POWER cells, a colour with more pieces than that can't be
+# wiped out in one move, which settles most positions with a bit count.
+#
+# The search checks for a winning spread at every node before doing anything
+# else, and at the root the agent plays one if it has it and otherwise avoids
+# moves that leave the enemy one, looking past the search's beam at every
+# legal move if it has to.
+
+from .board import Board, MAX_POWER, WIN_POWER_DIFF, DIRECTIONS, ENEMY, SPREAD_MASKS, cellPosition, iterBits
+from .moves import allMoves
+
+
+def generateSpreadReach():
+    """ Generates SPREAD_REACH[cell][power], the cells a stack can hit in any direction """
+    spreadReach = []
+    for byDirection in SPREAD_MASKS:
+        byPower = []
+        for power in range(MAX_POWER + 1):
+            mask = 0
+            for masks in byDirection:
+                mask |= masks[power]
+            byPower.append(mask)
+        spreadReach.append(tuple(byPower))
+    return tuple(spreadReach)
+
+
+SPREAD_REACH = generateSpreadReach()
+
+
+def colourPower(state: Board, mask: int):
+    """ Returns the total power of the pieces in a mask """
+    planes = state.planes
+    return sum(p * (planes[p] & mask).bit_count() for p in range(1, MAX_POWER + 1))
+
+
+def winningSpread(state: Board, colourToMove):
+    """
+    Returns a spread of the colour to move that removes every enemy piece and
+    wins by at least WIN_POWER_DIFF, or None if it has none.
+    """
+    enemy = state.colourMask(ENEMY[colourToMove])
+    enemyCount = enemy.bit_count()
+    if not enemy or enemyCount > MAX_POWER:
+        return None
+
+    own = state.colourMask(colourToMove)
+    planes = state.planes
+    ownPower = None
+
+    # a stack lands on as many cells as its power, so weaker ones can't do it
+    for power in range(enemyCount, MAX_POWER + 1):
+        for index in iterBits(planes[power] & own):
+            if enemy & ~SPREAD_REACH[index][power]:
+                continue
+
+            for (d, masks) in enumerate(SPREAD_MASKS[index]):
+                landed = masks[power]
+                if enemy & ~landed:
+                    continue
+
+                # the enemy is gone, so we win if we keep enough power. Every
+                # landed cell becomes ours one power higher, except stacks at
+                # MAX_POWER which are removed
+                if ownPower is None:
+                    ownPower = colourPower(state, own)
+                after = ownPower - power - colourPower(state, landed & own) \
+                    + colourPower(state, landed) + landed.bit_count() \
+                    - (MAX_POWER + 1) * (planes[MAX_POWER] & landed).bit_count()
+                if after >= WIN_POWER_DIFF:
+                    return ('spread', cellPosition(index), DIRECTIONS[d])
+
+    return None
+
+
+def allowsWin(state: Board, colourToMove, move):
+    """ Checks whether a move leaves the enemy a winning spread """
+    token = state.apply(move)
+    allowed = winningSpread(state, ENEMY[colourToMove]) is not None
+    state.undo(token)
+    return allowed
+
+
+def safeMoves(state: Board, colourToMove, moves: list):
+    """
+    Returns the moves that don't leave the enemy a winning spread. If none
+    of them are safe, returns the safe moves among every legal move instead,
+    and if there are none of those either, all of the moves.
+    """
+    safe = [move for move in moves if not allowsWin(state, colourToMove, move)]
+    if safe:
+        return safe
+
+    safe = [
+        move for move in allMoves(state, colourToMove)
+        if move not in moves and not allowsWin(state, colourToMove, move)
+    ]
+    return safe if safe else moves
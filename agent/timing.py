@@ -0,0 +1,77 @@
+# COMP30024 Artificial Intelligence, Semester 1 2023
+# Project Part B: Game Playing Agent
+
+# Time management for the search. The referee passes the CPU time we have left
+# for the whole game into every action() call, so each move gets a share of it
+# based on how many more moves we expect to make before MAX_TURNS.
+
+import time
+
+from .board import MAX_TURNS
+
+# share of the remaining time that is never planned for
+RESERVE = 0.1
+
+# plan as if the game lasts at most this many more of our moves, and at least
+# this many, so the first moves are not starved and the last ones not flooded
+MOVES_HORIZON = 60
+MIN_MOVES_LEFT = 10
+
+# never give a single move more than this share of the remaining time
+MAX_SHARE = 0.2
+
+# how much longer we expect each deeper iteration to take than the last
+EXPECTED_GROWTH = 3
+
+
+class SearchTimeout(Exception):
+    """ Raised inside the search when the move's time budget runs out """
+
+
+def moveBudget(timeRemaining, turnCount: int):
+    """
+    Returns the CPU seconds to spend on this move, or None if the game has no
+    time limit. turnCount is the number of actions played so far by both sides.
+    """
+    if timeRemaining is None:
+        return None
+
+    movesLeft = (MAX_TURNS - turnCount + 1) // 2
+    movesLeft = max(MIN_MOVES_LEFT, min(MOVES_HORIZON, movesLeft))
+
+    budget = timeRemaining * (1 - RESERVE) / movesLeft
+    return max(0, min(budget, timeRemaining * MAX_SHARE))
+
+
+class SearchClock:
+    """
+    Tracks the CPU time used by one move's search against its budget. A
+    budget of None never expires. A search that waits on worker processes
+    uses no CPU of its own while they run, so it times itself with a wall
+    clock timer (e.g. time.perf_counter) instead. A search can also be
+    stopped early from another process through a shared stop flag.
+    """
+
+    def __init__(self, budget=None, timer=time.process_time, stop=None):
+        self.timer = timer
+        self.start = timer()
+        self.budget = budget
+        self.stop = stop
+
+    def elapsed(self):
+        return self.timer() - self.start
+
+    def remaining(self):
+        """ Returns the seconds left in the budget, or None if there is no limit """
+        if self.budget is None:
+            return None
+        return max(0, self.budget - self.elapsed())
+
+    def expired(self):
+        if self.stop is not None and self.stop.value:
+            return True
+        return self.budget is not None and self.elapsed() >= self.budget
+
+    def allows(self, estimate):
+        """ Checks whether another estimate seconds of work fits in the budget """
+        return self.budget is None or self.elapsed() + estimate < self.budget
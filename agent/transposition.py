@@ -0,0 +1,175 @@
+# COMP30024 Artificial Intelligence, Semester 1 2023
+# Project Part B: Game Playing Agent
+
+# A bounded transposition table for the minimax search. Different move orders
+# often reach the same position (spreads commute a lot on this board), so the
+# result of searching a position is remembered under its Zobrist key and
+# reused the next time the position is reached.
+
+import math
+
+import numpy as np
+
+from .board import DIRECTIONS, DIRECTION_INDEX, cellIndex, cellPosition
+
+# bound types of a stored score
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+TABLE_SIZE = 1 << 16
+
+
+class TranspositionTable:
+    """
+    A fixed number of slots indexed by the low bits of the position key. Each
+    entry is a tuple of (key, depth, bound, score, best move, generation).
+    """
+
+    def __init__(self, size: int = TABLE_SIZE):
+        # size must be a power of two so the low bits of a key pick its slot
+        self.mask = size - 1
+        self.slots = [None] * size
+        self.generation = 0
+
+    def clear(self):
+        """ Empties every slot """
+        self.slots = [None] * (self.mask + 1)
+
+    def newSearch(self):
+        """ Marks every existing entry as coming from an older search """
+        self.generation += 1
+
+    def probe(self, key: int):
+        """ Returns the entry stored for a key, or None """
+        entry = self.slots[key & self.mask]
+        if entry is not None and entry[0] == key:
+            return entry
+        return None
+
+    def bestMove(self, key: int):
+        """ Returns the best move stored for a key, or None """
+        entry = self.probe(key)
+        if entry is None:
+            return None
+        return entry[4]
+
+    def store(self, key: int, depth: int, bound: int, score, move):
+        """
+        Stores a search result. An entry from the current search is only
+        replaced by a result searched at least as deep.
+        """
+        index = key & self.mask
+        entry = self.slots[index]
+        if entry is None or entry[5] != self.generation or depth >= entry[1]:
+            self.slots[index] = (key, depth, bound, score, move, self.generation)
+
+
+
+################################################################################
+######################## Shared transposition table ############################
+################################################################################
+
+# A transposition table in a block of shared memory, which searches in several
+# processes read and write at once (see parallel.SmpPool). Each slot is two
+# 64-bit words: the entry packed into one word as data, and the key XORed with
+# that data. Slots are written without a lock, so another process may see a
+# slot half written; the key it gets back from the two words won't match, and
+# it just treats the slot as a miss.
+
+# scores are kept in 16 bits, with anything past SCORE_LIMIT (e.g. infinite
+# bounds) read back as infinite
+SCORE_LIMIT = (1 << 15) - 1
+
+SPAWN_COLOURS = ('r', 'b')
+
+
+def encodeMove(move):
+    """ Packs a move into 16 bits, with 0 for no move """
+    if move is None:
+        return 0
+    if move[0] == 'spread':
+        return 1 + (cellIndex(move[1]) << 4 | DIRECTION_INDEX[move[2]])
+    return 1 + (cellIndex(move[1]) << 4 | 1 << 3 | SPAWN_COLOURS.index(move[2]))
+
+
+def decodeMove(code: int):
+    """ Unpacks a move packed by encodeMove """
+    if code == 0:
+        return None
+    code -= 1
+    position = cellPosition(code >> 4)
+    if code & 1 << 3:
+        return ('spawn', position, SPAWN_COLOURS[code & 1])
+    return ('spread', position, DIRECTIONS[code & 7])
+
+
+def sharedTableBytes(size: int = TABLE_SIZE):
+    """ Returns the bytes of shared memory a SharedTranspositionTable of this size needs """
+    # one more slot than the table size holds the search generation
+    return (size + 1) * 2 * 8
+
+
+class SharedTranspositionTable:
+    """
+    The same interface as TranspositionTable, over a buffer (e.g. a
+    multiprocessing.shared_memory block's buf) that other processes share.
+    Only the owner's newSearch() moves the table on to a new generation.
+    """
+
+    def __init__(self, buffer, size: int = TABLE_SIZE, owner: bool = True):
+        self.mask = size - 1
+        self.words = np.ndarray((size + 1, 2), dtype=np.uint64, buffer=buffer)
+        self.owner = owner
+
+    @property
+    def generation(self):
+        return int(self.words[0, 0])
+
+    def clear(self):
+        """ Empties every slot """
+        self.words[1:] = 0
+
+    def newSearch(self):
+        """ Marks every existing entry as coming from an older search """
+        if self.owner:
+            self.words[0, 0] += 1
+
+    def probe(self, key: int):
+        """ Returns the entry stored for a key, or None """
+        (check, data) = self.words[(key & self.mask) + 1].tolist()
+        if data == 0 or check ^ data != key:
+            return None
+
+        score = (data & 0xFFFF) - (1 << 15)
+        if abs(score) >= SCORE_LIMIT:
+            score = math.copysign(math.inf, score)
+        return (
+            key, data >> 16 & 0xFF, data >> 24 & 3, score,
+            decodeMove(data >> 34 & 0xFFFF), data >> 26 & 0xFF,
+        )
+
+    def bestMove(self, key: int):
+        """ Returns the best move stored for a key, or None """
+        entry = self.probe(key)
+        if entry is None:
+            return None
+        return entry[4]
+
+    def store(self, key: int, depth: int, bound: int, score, move):
+        """
+        Stores a search result. An entry from the current search is only
+        replaced by a result searched at least as deep.
+        """
+        index = (key & self.mask) + 1
+        generation = int(self.words[0, 0]) & 0xFF
+        data = int(self.words[index, 1])
+        if data and (data >> 26 & 0xFF) == generation and depth < (data >> 16 & 0xFF):
+            return
+
+        score = int(max(-SCORE_LIMIT, min(SCORE_LIMIT, score)))
+        data = (
+            score + (1 << 15) | min(depth, 0xFF) << 16 | bound << 24
+            | generation << 26 | encodeMove(move) << 34
+        )
+        self.words[index] = (key ^ data, data)
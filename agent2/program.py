@@ -1,10 +1,10 @@
 # COMP30024 Artificial Intelligence, Semester 1 2023
 # Project Part B: Game Playing Agent
 
-import copy
 from dataclasses import dataclass
 from referee.game import \
-    PlayerColor, Action, SpawnAction, SpreadAction, HexPos, HexDir
+    PlayerColor, Action, SpawnAction, SpreadAction, HexPos, HexDir, \
+    CELL_POSITIONS, spread_cells, apply_spread
 from .utils import render_board
 from .coverage import getCoverages, peaceful, evaluateAtkDef
 #import random
@@ -116,58 +116,37 @@ class Board:
 
     def spread(self, piece: tuple, direction: tuple):
         """ Spreads a piece (its position) in a direction on the board """
-        colour = self.board.get(piece)[0]
-        spreadDistance = self.board.get(piece)[1]
-
-        temp = piece 
-
-        # go through all the spread distance
-        while spreadDistance:
-            newPosition = self.findNewPosition(temp, direction)
-            self.spreadToNode(newPosition, colour)
-
-            # set temp to new position to use again next iteration
-            temp = newPosition
-
-            spreadDistance -= 1
-
-        # delete original piece from board
-        del self.board[piece]
+        # destinations come from the shared precomputed spread table
+        apply_spread(self.board, piece, direction)
             
 
-    def findNewPosition(self, position, direction):
-        """ Finds the destination of a node after a move in a direction """
-
-        newR = position[0] + direction[0]
-        newQ = position[1] + direction[1]
+    def apply(self, move: tuple):
+        """
+        Applies a ('spread', position, direction) or ('spawn', position, colour)
+        move in place, returning a token of the cells it touched for undo()
+        """
+        touched = [move[1]]
+        if move[0] == 'spread':
+            for index in spread_cells(move[1], move[2], self.board.get(move[1])[1]):
+                touched.append(CELL_POSITIONS[index])
 
-        # require both r and q to be positive, and also less than the dimension
-        if newR < 0:
-            newR = DIM - 1
-        elif newR >= DIM:
-            newR = 0
+        # remember what was on each touched cell before the move
+        token = [(position, self.board.get(position)) for position in touched]
 
-        if newQ < 0:
-            newQ = DIM - 1
-        elif newQ >= DIM:
-            newQ = 0
+        if move[0] == 'spread':
+            self.spread(move[1], move[2])
+        else:
+            self.spawn(move[1], move[2])
 
-        return (newR, newQ)
+        return token
 
-    def spreadToNode(self, newPosition, colour):
-            """ 
-            Increments power of a node and changes its colour if it is an enemy node, 
-            or removing the node if the max power is reached 
-            """
-            if newPosition not in self.board.keys():
-                self.board[newPosition] = (colour, 1)    
+    def undo(self, token):
+        """ Takes back the move that returned the token from apply() """
+        for (position, value) in token:
+            if value is None:
+                self.board.pop(position, None)
             else:
-                power = self.board.get(newPosition)[1]
-                if power == MAX_POWER:
-                    self.board.pop(newPosition)
-                else:
-                    self.board[newPosition] = (colour, 1 + power)
-            return
+                self.board[position] = value
     
     def getValues(self):
         return self.board.values()
@@ -192,15 +171,15 @@ class Board:
         c = 'r'
         if colour == 'r':
             c = 'b'
-        temp = copy.deepcopy(self)
-        for piece in self.board.keys():
+        for piece in list(self.board.keys()):
             if self.board.get(piece)[0] == colour:
                 # spread the piece in all directions
                 for direction in DIRECTIONS:
-                    temp.spread(piece, direction)
-                    if countColour(temp.board, c) == 0:
+                    token = self.apply(('spread', piece, direction))
+                    killed = countColour(self.board, c) == 0
+                    self.undo(token) # reset to original state
+                    if killed:
                         return ('spread', piece, direction)
-                    temp = copy.deepcopy(self) # reset temp to original state
         return None
 
 
@@ -212,8 +191,7 @@ def get_successors(state: Board, colourToMove):
     """ gets the successors, possible states we need to explore """
     successors = []
 
-    # do we need to copy board into state? just use the board argument
-    temp = copy.deepcopy(state)
+    # candidate moves are applied to the board in place and taken back again
     
     # loop through the board and find all player's piece
     # when you land on a piece perform a spread in 6 directions
@@ -236,11 +214,7 @@ def get_successors(state: Board, colourToMove):
         if(state.board.get(position)[0] == colourToMove):
             # spread in all directions
             for direction in DIRECTIONS:
-                temp.spread(position, direction)
-                #temp.turn += 1
-                successors.append((temp, ('spread', position, direction)))
-                #spreads.append((temp, ('spread', position, direction)))
-                temp = copy.deepcopy(state) # reset temp to original state
+                successors.append(('spread', position, direction))
     
     #spawns = []
     if getTotalPower(state.board) < MAX_BOARD_POW:
@@ -250,21 +224,23 @@ def get_successors(state: Board, colourToMove):
                 if (r,q) not in state.board.keys():
                     playerCoverage = colourToMoveCoverage[r,q]
                     if playerCoverage >= colourJustPlayedCoverage[(r,q)]:
-                        temp.spawn((r, q), colourToMove)
-                        #temp.turn += 1
-                        successors.append((temp, ('spawn', (r, q), colourToMove)))
-                        #spawns.append((temp, ('spawn', (r, q), colourToMove)))
-                        temp = copy.deepcopy(state)
+                        successors.append(('spawn', (r, q), colourToMove))
     
+    scored = []
+    for move in successors:
+        token = state.apply(move)
+        scored.append((evaluateAtkDef(state.board, ENEMY[colourToMove]), evaluatePower(state.board), move))
+        state.undo(token)
+    successors = scored
 
     bestForPower = None
     # person just moved is r --> next to move is b, vice versa
     if colourToMove == 'r':
-        successors = sorted(successors, key = lambda x: evaluateAtkDef(x[0].board, 'b'), reverse=True)
-        bestForPower = max(successors, key = lambda x: evaluatePower(x[0].board))
+        successors = sorted(successors, key = lambda x: x[0], reverse=True)
+        bestForPower = max(successors, key = lambda x: x[1])
     else:
-        successors = sorted(successors, key = lambda x: evaluateAtkDef(x[0].board, 'r'))
-        bestForPower = min(successors, key = lambda x: evaluatePower(x[0].board))
+        successors = sorted(successors, key = lambda x: x[0])
+        bestForPower = min(successors, key = lambda x: x[1])
     
     b = min(len(successors), BREADTH)
 
@@ -277,7 +253,7 @@ def get_successors(state: Board, colourToMove):
 
     chosenSuccessors.insert(0, bestForPower)
 
-    return chosenSuccessors
+    return [move for (_, _, move) in chosenSuccessors]
 
 
     #if colourToMove == 'r':
@@ -377,8 +353,10 @@ class minimax:
         #    alpha = max(alpha, v)
         #    if alpha >= beta:
         #        return beta
-        for s in get_successors(state, colour):
-            v = max(v, self.min_value(s[0], alpha, beta, new_colour, depth - 1))
+        for move in get_successors(state, colour):
+            token = state.apply(move)
+            v = max(v, self.min_value(state, alpha, beta, new_colour, depth - 1))
+            state.undo(token)
 
             alpha = max(alpha, v)
             if alpha >= beta:
@@ -421,8 +399,10 @@ class minimax:
         #    if v <= alpha:
         #        return v
         #    beta = min(beta, v)
-        for s in get_successors(state, colour):
-            v = min(v, self.max_value(s[0], alpha, beta, new_colour, depth - 1))
+        for move in get_successors(state, colour):
+            token = state.apply(move)
+            v = min(v, self.max_value(state, alpha, beta, new_colour, depth - 1))
+            state.undo(token)
 
             if v <= alpha:
                 return v
@@ -458,14 +438,14 @@ class minimax:
         #        beta = min(beta, best_score)
         if colour == 'r':
             best_score = -math.inf
-            for s in get_successors(board, colour):
-                #print("current successor for red")
-                #print(render_board(s[0].board))
-                score = self.min_value(s[0], alpha, beta, ENEMY[colour], DEPTH - 1)
+            for move in get_successors(board, colour):
+                token = board.apply(move)
+                score = self.min_value(board, alpha, beta, ENEMY[colour], DEPTH - 1)
+                board.undo(token)
                 
                 if score > best_score:
                     best_score = score
-                    next_move = s
+                    next_move = move
                     #print("new best score found for red")
                     #print(score)
                     #print(render_board(s[0].board))
@@ -473,15 +453,17 @@ class minimax:
         
         else:
             best_score = math.inf
-            for s in get_successors(board, colour):
-                score = self.max_value(s[0], alpha, beta, ENEMY[colour], DEPTH - 1)
+            for move in get_successors(board, colour):
+                token = board.apply(move)
+                score = self.max_value(board, alpha, beta, ENEMY[colour], DEPTH - 1)
+                board.undo(token)
 
                 if score < best_score:
                     best_score = score
-                    next_move = s
+                    next_move = move
                 beta = min(beta, best_score)
         
-        return next_move[1]
+        return next_move
 
 ################################################################################
 ############################### End Program ####################################
@@ -22,10 +22,10 @@
 #              gives the highest score.
 # the above comments were made by an AI lol :)
 
-import copy
 from dataclasses import dataclass
 from referee.game import \
-    PlayerColor, Action, SpawnAction, SpreadAction, HexPos, HexDir
+    PlayerColor, Action, SpawnAction, SpreadAction, HexPos, HexDir, \
+    CELL_POSITIONS, spread_cells, apply_spread
 
 DIM = 7
 MAX_POWER = DIM - 1
@@ -97,22 +97,14 @@ class Agent:
         best_score = -float('inf')
 
         for move in legal_moves:
-            next_state = copy.deepcopy(self.board)
-            next_state = self.apply_move(move, next_state)
-            score = self.evaluate_score(next_state.board, self.colour)
+            token = self.board.apply(move)
+            score = self.evaluate_score(self.board.board, self.colour)
+            self.board.undo(token)
             if score > best_score:
                 best_move = move
                 best_score = score
         return best_move
     
-    def apply_move(self, move:tuple, boardcopy):
-        if(move[0] == 'spread'):
-            boardcopy.spread(move[1], move[2])
-        else:
-            boardcopy.spawn(move[1], self.colour)
-
-        return boardcopy
-    
     def evaluate_score(self, state:dict[tuple, tuple], colour):
         result = 0
         for piece in state.keys():
@@ -156,15 +148,15 @@ class Agent:
         c = 'r'
         if colour == 'r':
             c = 'b'
-        temp = copy.deepcopy(self.board)
-        for piece in self.board.board.keys():
+        for piece in list(self.board.board.keys()):
             if self.board.board.get(piece)[0] == colour:
                 # spread the piece in all directions
                 for direction in DIRECTIONS:
-                    temp.board.spread(piece, direction)
-                    if countColour(temp.board.board, c) == 0:
+                    token = self.board.apply(('spread', piece, direction))
+                    killed = countColour(self.board.board, c) == 0
+                    self.board.undo(token) # reset to original state
+                    if killed:
                         return ('spread', piece, direction)
-                    temp = copy.deepcopy(self) # reset temp to original state
         return None
     
     
@@ -199,58 +191,37 @@ class Board:
 
     def spread(self, piece: tuple, direction: tuple):
         """ Spreads a piece (its position) in a direction on the board """
-        colour = self.board.get(piece)[0]
-        spreadDistance = self.board.get(piece)[1]
-
-        temp = piece 
-
-        # go through all the spread distance
-        while spreadDistance:
-            newPosition = self.findNewPosition(temp, direction)
-            self.spreadToNode(newPosition, colour)
-
-            # set temp to new position to use again next iteration
-            temp = newPosition
-
-            spreadDistance -= 1
-
-        # delete original piece from board
-        del self.board[piece]
+        # destinations come from the shared precomputed spread table
+        apply_spread(self.board, piece, direction)
             
 
-    def findNewPosition(self, position, direction):
-        """ Finds the destination of a node after a move in a direction """
-
-        newR = position[0] + direction[0]
-        newQ = position[1] + direction[1]
+    def apply(self, move: tuple):
+        """
+        Applies a ('spread', position, direction) or ('spawn', position, colour)
+        move in place, returning a token of the cells it touched for undo()
+        """
+        touched = [move[1]]
+        if move[0] == 'spread':
+            for index in spread_cells(move[1], move[2], self.board.get(move[1])[1]):
+                touched.append(CELL_POSITIONS[index])
 
-        # require both r and q to be positive, and also less than the dimension
-        if newR < 0:
-            newR = DIM - 1
-        elif newR >= DIM:
-            newR = 0
+        # remember what was on each touched cell before the move
+        token = [(position, self.board.get(position)) for position in touched]
 
-        if newQ < 0:
-            newQ = DIM - 1
-        elif newQ >= DIM:
-            newQ = 0
+        if move[0] == 'spread':
+            self.spread(move[1], move[2])
+        else:
+            self.spawn(move[1], move[2])
 
-        return (newR, newQ)
+        return token
 
-    def spreadToNode(self, newPosition, colour):
-            """ 
-            Increments power of a node and changes its colour if it is an enemy node, 
-            or removing the node if the max power is reached 
-            """
-            if newPosition not in self.board.keys():
-                self.board[newPosition] = (colour, 1)    
+    def undo(self, token):
+        """ Takes back the move that returned the token from apply() """
+        for (position, value) in token:
+            if value is None:
+                self.board.pop(position, None)
             else:
-                power = self.board.get(newPosition)[1]
-                if power == MAX_POWER:
-                    self.board.pop(newPosition)
-                else:
-                    self.board[newPosition] = (colour, 1 + power)
-            return
+                self.board[position] = value
     
     def getValues(self):
         return self.board.values()
@@ -275,15 +246,15 @@ class Board:
         c = 'r'
         if colour == 'r':
             c = 'b'
-        temp = copy.deepcopy(self)
-        for piece in self.board.keys():
+        for piece in list(self.board.keys()):
             if self.board.get(piece)[0] == colour:
                 # spread the piece in all directions
                 for direction in DIRECTIONS:
-                    temp.spread(piece, direction)
-                    if countColour(temp.board, c) == 0:
+                    token = self.apply(('spread', piece, direction))
+                    killed = countColour(self.board, c) == 0
+                    self.undo(token) # reset to original state
+                    if killed:
                         return ('spread', piece, direction)
-                    temp = copy.deepcopy(self) # reset temp to original state
         return None
     
     def getLegalMoves(self, colour):
@@ -297,7 +268,7 @@ class Board:
         for r in range(DIM):
             for q in range(DIM):
                 if (r, q) not in self.board.keys() and getTotalPower(self.board) < MAX_BOARD_POW:
-                    legalMoves.append(('spawn', (r, q)))
+                    legalMoves.append(('spawn', (r, q), colour))
         
         return legalMoves
 
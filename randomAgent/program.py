@@ -1,7 +1,8 @@
 import copy
 from dataclasses import dataclass
 from referee.game import \
-    PlayerColor, Action, SpawnAction, SpreadAction, HexPos, HexDir
+    PlayerColor, Action, SpawnAction, SpreadAction, HexPos, HexDir, \
+    apply_spread
 import random
 
 # This is the entry point for your game playing agent. Currently the agent
@@ -126,59 +127,10 @@ class Board:
 
     def spread(self, piece: tuple, direction: tuple):
         """ Spreads a piece (its position) in a direction on the board """
-        colour = self.board.get(piece)[0]
-        spreadDistance = self.board.get(piece)[1]
-
-        temp = piece 
-
-        # go through all the spread distance
-        while spreadDistance:
-            newPosition = self.findNewPosition(temp, direction)
-            self.spreadToNode(newPosition, colour)
-
-            # set temp to new position to use again next iteration
-            temp = newPosition
-
-            spreadDistance -= 1
-
-        # delete original piece from board
-        del self.board[piece]
+        # destinations come from the shared precomputed spread table
+        apply_spread(self.board, piece, direction)
             
 
-    def findNewPosition(self, position, direction):
-        """ Finds the destination of a node after a move in a direction """
-
-        newR = position[0] + direction[0]
-        newQ = position[1] + direction[1]
-
-        # require both r and q to be positive, and also less than the dimension
-        if newR < 0:
-            newR = DIM - 1
-        elif newR >= DIM:
-            newR = 0
-
-        if newQ < 0:
-            newQ = DIM - 1
-        elif newQ >= DIM:
-            newQ = 0
-
-        return (newR, newQ)
-
-    def spreadToNode(self, newPosition, colour):
-            """ 
-            Increments power of a node and changes its colour if it is an enemy node, 
-            or removing the node if the max power is reached 
-            """
-            if newPosition not in self.board.keys():
-                self.board[newPosition] = (colour, 1)    
-            else:
-                power = self.board.get(newPosition)[1]
-                if power == MAX_POWER:
-                    self.board.pop(newPosition)
-                else:
-                    self.board[newPosition] = (colour, 1 + power)
-            return
-    
     def getValues(self):
         return self.board.values()
     
@@ -11,6 +11,8 @@ from .player import Player
 from .board import Board, PlayerColor
 from .actions import Action, SpawnAction, SpreadAction
 from .exceptions import PlayerException, IllegalActionException
+from .spreads import SPREAD_TABLE, DIRECTION_INDEX, CELL_POSITIONS, \
+    cell_index, spread_cells, apply_spread
 
 
 # Here we define the ADT for all possible game updates. This is a useful
@@ -9,6 +9,7 @@ from .player import PlayerColor
 from .actions import Action, SpawnAction, SpreadAction
 from .exceptions import IllegalActionException
 from .constants import *
+from .spreads import CELL_HEXPOS, spread_cells
 
 
 # The CellState class is used to represent the state of a single cell on the
@@ -282,9 +283,11 @@ class Board:
                 f"SPREAD cell {from_cell} not occupied by {action_player}",
                 self._turn_color)
 
-        # Compute destination cell coords.
+        # Look up destination cell coords (precomputed, see spreads.py).
         to_cells = [
-            from_cell + dir * (i + 1) for i in range(self[from_cell].power)
+            CELL_HEXPOS[i] for i in spread_cells(
+                (from_cell.r, from_cell.q), (dir.r, dir.q), self[from_cell].power
+            )
         ]
 
         return BoardMutation(
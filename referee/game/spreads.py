@@ -0,0 +1,91 @@
+# COMP30024 Artificial Intelligence, Semester 1 2023
+# Project Part B: Game Playing Agent
+
+from .constants import BOARD_N, MAX_CELL_POWER
+from .hex import HexPos, HexDir
+
+
+# Spread destinations are the same in every game, so they are worked out once
+# here instead of being stepped through (with wraparound) on every spread.
+# Cells are numbered r * BOARD_N + q and directions are numbered in HexDir
+# order. SPREAD_TABLE[cell][direction][power] is the tuple of cells, in the
+# order they are reached, that a stack of that power lands on when spread from
+# that cell in that direction.
+
+NUM_CELLS = BOARD_N * BOARD_N
+
+DIRECTION_INDEX: dict[tuple[int, int], int] = {
+    (direction.r, direction.q): i for i, direction in enumerate(HexDir)
+}
+
+CELL_POSITIONS: tuple[tuple[int, int], ...] = tuple(
+    divmod(i, BOARD_N) for i in range(NUM_CELLS)
+)
+
+CELL_HEXPOS: tuple[HexPos, ...] = tuple(
+    HexPos(r, q) for r, q in CELL_POSITIONS
+)
+
+
+def cell_index(r: int, q: int) -> int:
+    """
+    Return the flat index of the cell at (r, q).
+    """
+    return r * BOARD_N + q
+
+
+def _build_spread_table() -> tuple[tuple[tuple[tuple[int, ...], ...], ...], ...]:
+    table = []
+    for r, q in CELL_POSITIONS:
+        by_direction = []
+        for direction in HexDir:
+            by_power = [
+                tuple(
+                    cell_index(
+                        (r + direction.r * step) % BOARD_N,
+                        (q + direction.q * step) % BOARD_N,
+                    )
+                    for step in range(1, power + 1)
+                )
+                for power in range(MAX_CELL_POWER + 1)
+            ]
+            by_direction.append(tuple(by_power))
+        table.append(tuple(by_direction))
+    return tuple(table)
+
+
+SPREAD_TABLE = _build_spread_table()
+
+
+def spread_cells(
+    cell: tuple[int, int],
+    direction: tuple[int, int],
+    power: int
+) -> tuple[int, ...]:
+    """
+    Return the flat indices of the cells, in order, that a stack of the given
+    power lands on when spread from `cell` in `direction` (both as (r, q)).
+    """
+    return SPREAD_TABLE[cell_index(*cell)][DIRECTION_INDEX[direction]][power]
+
+
+def apply_spread(
+    board: dict[tuple[int, int], tuple[str, int]],
+    cell: tuple[int, int],
+    direction: tuple[int, int]
+):
+    """
+    Apply a spread in place to a board stored as a dict mapping (r, q) to
+    (colour, power), as the agents do. Stacks spread onto at MAX_CELL_POWER
+    are removed, as in Board.apply_action.
+    """
+    colour, power = board.pop(cell)
+    for i in spread_cells(cell, direction, power):
+        position = CELL_POSITIONS[i]
+        target = board.get(position)
+        if target is None:
+            board[position] = (colour, 1)
+        elif target[1] >= MAX_CELL_POWER:
+            del board[position]
+        else:
+            board[position] = (colour, target[1] + 1)
@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+from agent.board import Board, ENEMY, MAX_POWER, CELLS, ZOBRIST
+from agent.coverage import CoverageState
+from agent.moves import allMoves
+
+
+def playedPositions(seed: int, games: int, plies: int):
+    """
+    Yields (board, colour to move, move) along games of random legal moves
+    from the empty board, before each move is played. The boards carry a
+    coverage state, as the search's do.
+    """
+    rng = random.Random(seed)
+    for _ in range(games):
+        board = Board()
+        board.coverage = CoverageState(board)
+        colour = 'r'
+        for _ in range(plies):
+            move = rng.choice(allMoves(board, colour))
+            yield (board, colour, move)
+            board.apply(move)
+            colour = ENEMY[colour]
+
+
+def sparsePositions(seed: int, count: int):
+    """
+    Yields count boards with one to MAX_POWER pieces of each colour on random
+    cells at random powers, which random play rarely reaches
+    """
+    rng = random.Random(seed)
+    for _ in range(count):
+        cells = rng.sample(range(CELLS), rng.randint(1, MAX_POWER) + rng.randint(1, MAX_POWER))
+        split = rng.randint(1, len(cells) - 1)
+        pieces = [(index, 'r' if k < split else 'b', rng.randint(1, MAX_POWER)) for (k, index) in enumerate(cells)]
+        yield boardWith(pieces)
+
+
+def boardWith(pieces):
+    """ Returns a board holding (index, colour, power) pieces """
+    board = Board()
+    for (index, colour, power) in pieces:
+        bit = 1 << index
+        if colour == 'r':
+            board.red |= bit
+        else:
+            board.blue |= bit
+        board.planes[power] |= bit
+        board.key ^= ZOBRIST[colour][power][index]
+    return board
+
+
+@pytest.fixture
+def played():
+    return playedPositions
+
+
+@pytest.fixture
+def sparse():
+    return sparsePositions
@@ -0,0 +1,18 @@
+from agent.board import ENEMY
+from agent.batch import boardArrays, childArrays, evaluateBatch
+from agent.coverage import scoreAtkDef
+from agent.moves import allMoves
+
+
+def test_evaluate_batch_matches_score_atk_def(played):
+    for (board, colour, _) in played(seed=3, games=10, plies=60):
+        moves = allMoves(board, colour)
+        (owner, power) = boardArrays(board)
+        (owners, powers) = childArrays(owner, power, moves)
+        (primary, secondary, balance) = evaluateBatch(owners, powers, ENEMY[colour])
+
+        for (row, move) in enumerate(moves):
+            token = board.apply(move)
+            assert scoreAtkDef(board, ENEMY[colour]) == (primary[row], secondary[row], balance[row])
+            assert board.powerBalance() == balance[row]
+            board.undo(token)
@@ -0,0 +1,52 @@
+from referee.game import Board as RefereeBoard, SpawnAction, SpreadAction, HexPos, HexDir, PlayerColor
+
+from agent.board import ZOBRIST, DIM
+from agent.coverage import CoverageState
+
+REFEREE_COLOURS = {PlayerColor.RED: 'r', PlayerColor.BLUE: 'b'}
+
+
+def refereeCells(board: RefereeBoard):
+    """ Returns {(r, q): (colour, power)} for every occupied cell of a referee board """
+    cells = {}
+    for r in range(DIM):
+        for q in range(DIM):
+            state = board[HexPos(r, q)]
+            if state.player is not None:
+                cells[(r, q)] = (REFEREE_COLOURS[state.player], state.power)
+    return cells
+
+
+def refereeAction(move):
+    if move[0] == 'spawn':
+        return SpawnAction(HexPos(*move[1]))
+    return SpreadAction(HexPos(*move[1]), HexDir(move[2]))
+
+
+def test_apply_matches_referee(played):
+    (game, referee) = (None, None)
+    for (board, colour, move) in played(seed=1, games=40, plies=80):
+        # every game is played on a new board
+        if board is not game:
+            (game, referee) = (board, RefereeBoard())
+        token = board.apply(move)
+        referee.apply_action(refereeAction(move))
+        assert board.toDict() == refereeCells(referee)
+        board.undo(token)
+
+
+def test_undo_restores_key_and_coverage(played):
+    for (board, colour, move) in played(seed=2, games=40, plies=80):
+        key = board.key
+        coverage = board.coverage.snapshot()
+
+        token = board.apply(move)
+        expected = 0
+        for (index, pieceColour, power) in board.pieces():
+            expected ^= ZOBRIST[pieceColour][power][index]
+        assert board.key == expected
+        assert board.coverage.snapshot() == CoverageState(board).snapshot()
+
+        board.undo(token)
+        assert board.key == key
+        assert board.coverage.snapshot() == coverage
@@ -0,0 +1,30 @@
+import random
+
+from agent.board import ENEMY
+from agent.book import OpeningBook, BOOK_PLIES, newBoard
+from agent.moves import allMoves
+
+
+def test_book_moves_are_legal():
+    book = OpeningBook()
+    rng = random.Random(7)
+    found = 0
+
+    # every position one action in, then random lines to the end of the book
+    board = newBoard()
+    for first in allMoves(board, 'r'):
+        tokens = [board.apply(first)]
+        colour = 'b'
+        for _ in range(BOOK_PLIES - 1):
+            moves = allMoves(board, colour)
+            move = book.lookup(board, colour)
+            if move is not None:
+                assert move in moves
+                found += 1
+            tokens.append(board.apply(rng.choice(moves)))
+            colour = ENEMY[colour]
+        for token in reversed(tokens):
+            board.undo(token)
+
+    assert book.lookup(board, 'r') in allMoves(board, 'r')
+    assert found > 0
@@ -0,0 +1,20 @@
+from agent.coverage import cacheEntries, CACHE_ENTRIES, MIN_CACHE_ENTRIES
+
+
+def test_cache_entries_without_limit():
+    # the referee reports minus our usage as space_remaining when unlimited
+    assert cacheEntries(-86, None) == CACHE_ENTRIES
+    assert cacheEntries(None, None) == CACHE_ENTRIES
+    assert cacheEntries(-86, 0) == CACHE_ENTRIES
+
+
+def test_cache_entries_with_limit():
+    assert cacheEntries(250, 250) == CACHE_ENTRIES
+    assert cacheEntries(None, 250) == CACHE_ENTRIES
+    assert cacheEntries(0.5, 250) == MIN_CACHE_ENTRIES
+    assert MIN_CACHE_ENTRIES < cacheEntries(50, 250) < CACHE_ENTRIES
+
+
+def test_cache_entries_out_of_space():
+    assert cacheEntries(-1, 250) == MIN_CACHE_ENTRIES
+    assert cacheEntries(0, 250) == MIN_CACHE_ENTRIES
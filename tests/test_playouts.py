@@ -0,0 +1,46 @@
+import numpy as np
+
+from agent.board import DIRECTIONS, MAX_POWER, cellIndex, cellPosition
+from agent.batch import COLOUR_CODE, boardArrays
+from agent.playouts import randomMoves, applyMoves
+
+# random moves played from each position at once
+GAMES = 16
+
+
+def checkApplyMoves(board, colour, rng):
+    """ Plays GAMES random moves from a position with applyMoves and with Board.apply, returning how many removed a stack """
+    (owner, power) = boardArrays(board)
+    owner = np.repeat(owner[None], GAMES, axis=0)
+    power = np.repeat(power[None], GAMES, axis=0)
+    toMove = np.full(GAMES, COLOUR_CODE[colour], dtype=np.int8)
+
+    (spawn, cells, directions) = randomMoves(owner, power, toMove, rng)
+    applyMoves(owner, power, toMove, spawn, cells, directions)
+
+    removals = 0
+    for row in range(GAMES):
+        if spawn[row]:
+            move = ('spawn', cellPosition(int(cells[row])), colour)
+        else:
+            move = ('spread', cellPosition(int(cells[row])), DIRECTIONS[int(directions[row])])
+        stacks = board.planes[MAX_POWER] & ~(1 << cellIndex(move[1]))
+        token = board.apply(move)
+        removals += bool(stacks & ~board.occupied())
+        (expectedOwner, expectedPower) = boardArrays(board)
+        board.undo(token)
+        assert (owner[row] == expectedOwner).all() and (power[row] == expectedPower).all()
+    return removals
+
+
+def test_apply_moves_matches_board_apply(played, sparse):
+    rng = np.random.default_rng(6)
+    for (board, colour, _) in played(seed=6, games=20, plies=60):
+        checkApplyMoves(board, colour, rng)
+
+    # stacks spread onto at MAX_POWER are removed, which random play seldom reaches
+    removals = 0
+    for board in sparse(seed=6, count=500):
+        for colour in ('r', 'b'):
+            removals += checkApplyMoves(board, colour, rng)
+    assert removals > 0
@@ -0,0 +1,37 @@
+from agent.board import ENEMY, WIN_POWER_DIFF
+from agent.moves import allMoves
+from agent.threats import winningSpread
+
+
+def wins(board, colour, move):
+    """ Checks by playing it whether a move leaves the enemy no pieces and colour WIN_POWER_DIFF ahead """
+    token = board.apply(move)
+    lead = board.powerBalance() if colour == 'r' else -board.powerBalance()
+    won = not board.colourMask(ENEMY[colour]) and lead >= WIN_POWER_DIFF
+    board.undo(token)
+    return won
+
+
+def checkWinningSpread(board, colour):
+    spreads = [move for move in allMoves(board, colour) if move[0] == 'spread']
+    found = winningSpread(board, colour)
+    if found is None:
+        assert not any(wins(board, colour, move) for move in spreads)
+    else:
+        assert found in spreads and wins(board, colour, found)
+    return found is not None
+
+
+def test_winning_spread_in_sparse_positions(sparse):
+    found = 0
+    for board in sparse(seed=4, count=3000):
+        for colour in ('r', 'b'):
+            found += checkWinningSpread(board, colour)
+
+    # the sample must hold enough wins for the check to mean something
+    assert found > 100
+
+
+def test_winning_spread_in_played_positions(played):
+    for (board, colour, _) in played(seed=5, games=40, plies=80):
+        checkWinningSpread(board, colour)
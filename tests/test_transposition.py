@@ -0,0 +1,15 @@
+from agent.board import CELLS, DIRECTIONS, cellPosition
+from agent.transposition import encodeMove, decodeMove
+
+
+def test_encode_decode_round_trip():
+    moves = [None]
+    for index in range(CELLS):
+        position = cellPosition(index)
+        moves += [('spread', position, direction) for direction in DIRECTIONS]
+        moves += [('spawn', position, colour) for colour in ('r', 'b')]
+
+    codes = [encodeMove(move) for move in moves]
+    assert len(set(codes)) == len(moves)
+    assert all(0 <= code < 1 << 16 for code in codes)
+    assert [decodeMove(code) for code in codes] == moves